@@ -0,0 +1,175 @@
+"""
+Offline end-to-end benchmark of 'Scrapper.run_sequence' against the fake LinkedIn server.
+Reports jobs/min, the latency of each stage of the hot path, peak RSS of Python and
+Chrome and the time spent writing to the database.
+Usage: python -m benchmarks.bench_e2e --jobs 100 [--latency 0.05] [--workers 1] [--no-headless]
+    [--heavy-assets] [--lean]
+Run with --heavy-assets, with and without --lean, to measure the lean browser mode.
+"""
+import argparse
+import logging
+import os
+import resource
+import statistics
+import tempfile
+from functools import wraps
+from threading import Event, Thread
+from time import perf_counter
+import psutil
+from benchmarks.fake_linkedin import FakeLinkedIn, heavy_assets_html
+
+QUERY = "python developer"
+
+
+class StageTimer():
+    """
+    Wraps methods of an object and records how long each call takes.
+    The stages of a 'group' may call each other, so the group total only counts the
+    outermost calls.
+    """
+    def __init__(self) -> None:
+        self.durations: dict[str, list[float]] = {}
+        self.group_totals: dict[str, float] = {}
+        self._group_depth: dict[str, int] = {}
+
+    def wrap(self, obj, method_name:str, stage:str|None=None, group:str|None=None):
+        stage = stage or method_name
+        method = getattr(obj, method_name)
+
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            if group is not None:
+                self._group_depth[group] = self._group_depth.get(group, 0) + 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                self.durations.setdefault(stage, []).append(elapsed)
+                if group is not None:
+                    self._group_depth[group] -= 1
+                    if self._group_depth[group] == 0:
+                        self.group_totals[group] = self.group_totals.get(group, 0) + elapsed
+        setattr(obj, method_name, wrapper)
+
+    def report(self):
+        print(f"{'stage':<24}{'calls':>7}{'total s':>10}{'mean ms':>10}{'p95 ms':>10}")
+        for stage, values in self.durations.items():
+            p95 = statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+            print(f"{stage:<24}{len(values):>7}{sum(values):>10.2f}{statistics.mean(values)*1000:>10.1f}{p95*1000:>10.1f}")
+
+
+class RSSSampler():
+    """
+    Samples the memory of the Chrome and chromedriver processes started by this process
+    """
+    def __init__(self, interval:float=0.5) -> None:
+        self.interval = interval
+        self.peak_children_rss = 0
+        self._stop = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        me = psutil.Process()
+        while not self._stop.wait(self.interval):
+            rss = 0
+            for child in me.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                except psutil.Error:
+                    continue
+            self.peak_children_rss = max(self.peak_children_rss, rss)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def set_environment(folder:str):
+    defaults = {
+        "BACKUP_FOLDER": f"{folder}/backup",
+        "LOG_FOLDER": f"{folder}/log",
+        "SCREENSHOT_FOLDER": f"{folder}/screenshots",
+        "SCRAP_STATE_FILE": "scrap_state.json",
+        "DISCONNECT_TIMEOUT": "1",
+        "DISCONNECT_MULTIPLIER": "0",
+        "DISCONNECT_MAX_RETRIES": "1",
+        "MAX_SCRAPPER_PERSISTENCE": "1",
+        "MY_SKILLS": '["Python","Django","SQL","Docker","AWS","Linux"]'
+    }
+    for key, value in defaults.items():
+        os.environ[key] = value
+        if key.endswith("_FOLDER"):
+            os.makedirs(value, exist_ok=True)
+
+def build_scrapper(args, base_url:str, folder:str, timer:StageTimer):
+    # The scrapper modules read the environment on import
+    from src.db import DB
+    from src.scrapper import Scrapper
+    db = DB("bench.sqlite", output_folder=f"{folder}/results")
+    scrapper = Scrapper(
+        job_data=db,
+        headless=args.headless,
+        load_timeout=30,
+        max_n_jobs=args.jobs,
+        driver_logging=False,
+        n_workers=args.workers,
+        base_url=base_url,
+        lean=args.lean,
+        fetch_mode="http" if args.http else "browser",
+        http_skills_fallback=not args.no_skills_fallback
+    )
+    for name in ["driver_get_link", "get_job_links_list", "scrape_job_page", "get_skills",
+            "get_apply_link", "scrape_fetched", "generate_match_columns"]:
+        timer.wrap(scrapper, name)
+    timer.wrap(db, "write_many", "db.write_many", group="db")
+    timer.wrap(db, "flush", "db.flush", group="db")
+    return scrapper, db
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=100, help="Size of the job corpus")
+    parser.add_argument("--latency", type=float, default=0, help="Seconds added to every response")
+    parser.add_argument("--workers", type=int, default=1, help="Number of webdriver sessions")
+    parser.add_argument("--no-headless", dest="headless", action="store_false")
+    parser.add_argument("--heavy-assets", action="store_true", help="Serve images, fonts, video and scripts in job pages")
+    parser.add_argument("--lean", action="store_true", help="Run the scrapper in lean mode")
+    parser.add_argument("--http", action="store_true", help="Fetch the job pages without the browser")
+    parser.add_argument("--no-skills-fallback", action="store_true",
+        help="In http mode, don't read the skills in the browser (no skills are scraped)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    asset_html = heavy_assets_html() if args.heavy_assets else ""
+    server = FakeLinkedIn(corpus_size=args.jobs, latency=args.latency, asset_html=asset_html).start()
+    with tempfile.TemporaryDirectory() as folder:
+        set_environment(folder)
+        timer = StageTimer()
+        sampler = RSSSampler().start()
+        scrapper, db = build_scrapper(args, server.url, folder, timer)
+        try:
+            scrapper.sign_in()
+            start = perf_counter()
+            scrapper.run_sequence(QUERY)
+            elapsed = perf_counter() - start
+        finally:
+            sampler.stop()
+            scrapper.quit()
+            server.stop()
+        n_jobs = db.cursor.execute("SELECT count(*) FROM details").fetchone()[0]
+
+    print(f"Scraped {n_jobs}/{args.jobs} jobs in {elapsed:.1f}s -> {n_jobs / elapsed * 60:.1f} jobs/min")
+    print(f"HTTP requests served: {server.n_requests} (assets: {server.n_asset_requests})")
+    # ru_maxrss is in kilobytes on Linux
+    print(f"Peak RSS: python={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}MB "
+        f"chrome+chromedriver={sampler.peak_children_rss / 2**20:.0f}MB")
+    print(f"DB write time: {timer.group_totals.get('db', 0):.3f}s")
+    timer.report()
+
+
+if __name__ == "__main__":
+    main()
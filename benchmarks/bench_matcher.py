@@ -0,0 +1,54 @@
+"""
+Compares the skill matching of 'Scrapper.generate_match_columns' before and after
+SkillMatcher on synthetic jobs.
+Usage: python -m benchmarks.bench_matcher [n_jobs]
+"""
+import logging
+import random
+import sys
+from time import perf_counter
+from src.matcher import SkillMatcher, find_matches, fuzz_match
+
+BASE_SKILLS = [
+    "Python", "Java", "JavaScript", "TypeScript", "Go", "Rust", "C++", "C#", "SQL", "PostgreSQL",
+    "MySQL", "MongoDB", "Redis", "Kafka", "Spark", "Hadoop", "Airflow", "dbt", "Docker", "Kubernetes",
+    "Terraform", "Ansible", "AWS", "Azure", "Google Cloud Platform", "Linux", "Git", "CI/CD", "Jenkins",
+    "REST APIs", "GraphQL", "Django", "Flask", "FastAPI", "React.js", "Node.js", "Angular", "Vue.js",
+    "Machine Learning", "Deep Learning", "PyTorch", "TensorFlow", "Pandas", "NumPy", "Data Analysis",
+    "Data Engineering", "ETL", "Tableau", "Power BI", "Agile Methodologies", "Scrum", "Communication",
+    "Leadership", "Problem Solving", "Microservices", "Distributed Systems", "Unit Testing", "Selenium"
+]
+QUALIFIERS = ["", "Advanced ", "Applied ", "Cloud ", "Enterprise ", "Modern "]
+MY_SKILLS = ["Python", "Django", "SQL", "PostgreSQL", "Docker", "AWS", "Linux", "Git", "Pandas",
+    "Machine learning", "REST API", "Selenium", "JavaScript", "Data analysis"]
+
+
+def make_jobs(n_jobs:int, seed:int=0):
+    rnd = random.Random(seed)
+    vocabulary = [q + s for s in BASE_SKILLS for q in QUALIFIERS]
+    return [rnd.sample(vocabulary, rnd.randint(0, 10)) for _ in range(n_jobs)]
+
+def run_current(jobs, threshold):
+    return [(fuzz_match(skills, MY_SKILLS, method="partial"), find_matches(skills, MY_SKILLS, threshold)) for skills in jobs]
+
+def run_matcher(jobs, threshold):
+    matcher = SkillMatcher(MY_SKILLS)
+    return [(matcher.fuzz_match(skills), matcher.find_matches(skills, threshold)) for skills in jobs]
+
+def main(n_jobs:int=10000, threshold:int=70):
+    jobs = make_jobs(n_jobs)
+    timings = {}
+    results = {}
+    for name, func in [("current", run_current), ("SkillMatcher", run_matcher)]:
+        start = perf_counter()
+        results[name] = func(jobs, threshold)
+        timings[name] = perf_counter() - start
+        print(f"{name:>12}: {timings[name]:.3f}s ({timings[name]/n_jobs*1e6:.1f} us/job)")
+    print(f"     speedup: {timings['current']/timings['SkillMatcher']:.1f}x")
+    assert results["current"] == results["SkillMatcher"], "The results are different!"
+
+
+if __name__ == "__main__":
+    # thefuzz warns on every skill that is reduced to an empty string
+    logging.disable(logging.WARNING)
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
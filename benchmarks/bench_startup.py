@@ -0,0 +1,118 @@
+"""
+Cold start benchmark of the scrapper process: the time from the start of a fresh Python
+process to the first page loaded in Chrome, against the fake LinkedIn server.
+Each run is a new process, so the imports are cold. The phases follow 'Runner.run_worker':
+imports, Scrapper (Chrome starts in the background), database and state, first page load.
+The results are appended to a JSON Lines history file, so the startup time can be tracked
+over time.
+Usage: python -m benchmarks.bench_startup [--runs 3] [--db-rows 50000] [--sequential]
+Run with --sequential to wait for Chrome before loading the database (the old startup path).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from time import time
+
+PHASES = ["imports", "scrapper", "database", "first_page"]
+
+
+def child(base_url:str, folder:str, sequential:bool):
+    """
+    Runs the startup path and prints the time of the end of each phase, in seconds since
+    the process started
+    """
+    import psutil
+    started = psutil.Process().create_time()
+    marks = {}
+    from src.scrapper import Scrapper
+    from src.db import DB
+    marks["imports"] = time() - started
+    scrapper = Scrapper(headless=True, load_timeout=30, driver_logging=False, base_url=base_url)
+    if sequential:
+        scrapper.driver
+    marks["scrapper"] = time() - started
+    scrapper.job_data = DB("bench.sqlite", output_folder=f"{folder}/results")
+    marks["database"] = time() - started
+    try:
+        scrapper.sign_in()
+        marks["first_page"] = time() - started
+    finally:
+        scrapper.quit()
+    print(json.dumps(marks))
+
+def fill_db(folder:str, n_rows:int):
+    from src.db import DB
+    db = DB("bench.sqlite", output_folder=f"{folder}/results")
+    crawl_time = datetime.now()
+    db.write_many({
+        "job_id": job_id,
+        "title": f"Job {job_id}",
+        "company_name": f"Company {job_id % 5000}",
+        "crawl_time": crawl_time,
+        "original_query": f"query {job_id % 10}",
+        "skills": [f"Skill {job_id % 300}", f"Skill {job_id % 7}"]
+    } for job_id in range(n_rows))
+    db.flush()
+    db.conn.close()
+
+def git_revision() -> str|None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Number of cold starts")
+    parser.add_argument("--db-rows", type=int, default=50000, help="Number of jobs in the database")
+    parser.add_argument("--sequential", action="store_true", help="Wait for Chrome before loading the database")
+    parser.add_argument("--history", default="benchmarks/startup_history.jsonl", help="File the results are appended to")
+    parser.add_argument("--child", nargs=2, metavar=("BASE_URL", "FOLDER"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        child(*args.child, args.sequential)
+        return
+
+    from benchmarks.bench_e2e import set_environment
+    from benchmarks.fake_linkedin import FakeLinkedIn
+    server = FakeLinkedIn().start()
+    runs = []
+    with tempfile.TemporaryDirectory() as folder:
+        set_environment(folder)
+        os.makedirs(f"{folder}/results", exist_ok=True)
+        fill_db(folder, args.db_rows)
+        command = [sys.executable, "-m", "benchmarks.bench_startup", "--child", server.url, folder]
+        if args.sequential:
+            command.append("--sequential")
+        try:
+            for _ in range(args.runs):
+                output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+        finally:
+            server.stop()
+
+    print(f"{'phase':<14}{'mean s':>10}{'min s':>10}{'max s':>10}")
+    for phase in PHASES:
+        values = [run[phase] for run in runs]
+        print(f"{phase:<14}{statistics.mean(values):>10.3f}{min(values):>10.3f}{max(values):>10.3f}")
+    result = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "runs": args.runs,
+        "db_rows": args.db_rows,
+        "sequential": args.sequential,
+        "time_to_first_page": statistics.mean(run["first_page"] for run in runs),
+        "phases": {phase: statistics.mean(run[phase] for run in runs) for phase in PHASES}
+    }
+    with open(args.history, "a") as f:
+        f.write(json.dumps(result) + "\n")
+    print(f"Time to first page load: {result['time_to_first_page']:.3f}s (appended to {args.history})")
+
+
+if __name__ == "__main__":
+    main()
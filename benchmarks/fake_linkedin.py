@@ -0,0 +1,216 @@
+"""
+A local stand-in for the LinkedIn pages the scrapper reads. It serves a signed-in home
+page, search result pages, job pages with a skills modal and an apply button, and the
+external apply pages, all with the same XPaths and classes the scrapper relies on.
+The content of each job is generated from its id, so every run sees the same corpus.
+"""
+import random
+import re
+from datetime import date, timedelta
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import sleep
+from urllib.parse import parse_qs, urlparse
+
+PAGE_SIZE = 25
+FIRST_JOB_ID = 4000000000
+
+TITLES = ["Python Developer", "Backend Engineer", "Data Engineer", "Software Engineer",
+    "Machine Learning Engineer", "Full Stack Developer", "DevOps Engineer", "QA Automation Engineer"]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", "Wayne Enterprises",
+    "Cyberdyne", "Soylent", "Tyrell", "Wonka", "Vandelay Industries"]
+LOCATIONS = ["Calgary, AB", "Toronto, ON", "Vancouver, BC", "Montreal, QC", "Canada (Remote)"]
+SKILLS = ["Python", "Django", "Flask", "SQL", "PostgreSQL", "Docker", "Kubernetes", "AWS", "Azure",
+    "Linux", "Git", "REST APIs", "Machine Learning", "Pandas", "Spark", "Kafka", "Java", "Go",
+    "JavaScript", "React.js", "CI/CD", "Terraform", "Communication", "Agile Methodologies"]
+
+job_view_pattern = re.compile(r"^/jobs/view/(\d+)/?$")
+apply_pattern = re.compile(r"^/apply/(\d+)/?$")
+external_apply_pattern = re.compile(r"^/jobs/view/externalApply/(\d+)/?$")
+asset_pattern = re.compile(r"^/assets/\d+(\.\w+)$")
+
+ASSET_CONTENT_TYPES = {
+    ".png": "image/png", ".jpg": "image/jpeg", ".woff2": "font/woff2", ".mp4": "video/mp4",
+    ".css": "text/css", ".js": "application/javascript"
+}
+
+
+def job_details(job_id:int) -> dict:
+    rnd = random.Random(job_id)
+    hours = rnd.randint(1, 23 * 7)
+    return {
+        "title": rnd.choice(TITLES),
+        "company": rnd.choice(COMPANIES),
+        "location": rnd.choice(LOCATIONS),
+        "post_time": f"{hours} hours ago" if hours < 24 else f"{hours // 24} days ago",
+        "post_date": date.today() - timedelta(hours=hours),
+        "applicants": rnd.randint(0, 300),
+        "skills": rnd.sample(SKILLS, rnd.randint(0, 10)),
+        "has_apply": rnd.random() < 0.5
+    }
+
+def page(title:str, body:str) -> str:
+    return f"<!DOCTYPE html><html><head><title>{escape(title)}</title></head><body>{body}</body></html>"
+
+def home_page() -> str:
+    return page("Feed | LinkedIn", '<nav id="global-nav"></nav><main>Home</main>')
+
+def search_page(start:int, corpus_size:int) -> str:
+    job_ids = range(FIRST_JOB_ID + start, FIRST_JOB_ID + min(start + PAGE_SIZE, corpus_size))
+    if len(job_ids) == 0:
+        return page("Jobs | LinkedIn", "<h1>No matching jobs found.</h1>")
+    cards = []
+    for job_id in job_ids:
+        details = job_details(job_id)
+        cards.append(
+            f'<li><div class="job-card-container">'
+            f'<a href="/jobs/view/{job_id}/?trk=flagship">{escape(details["title"])}</a>'
+            f'<a href="/jobs/view/{job_id}/">{escape(details["company"])}</a>'
+            f'<time datetime="{details["post_date"].isoformat()}">{details["post_time"]}</time>'
+            f'</div></li>'
+        )
+    return page("Jobs | LinkedIn", f"<ul>{''.join(cards)}</ul>")
+
+def job_page(job_id:int, asset_html:str="") -> str:
+    details = job_details(job_id)
+    skills = "".join(
+        f"<li><div>{escape(skill)}</div><div>Skill matches your profile</div></li>" for skill in details["skills"]
+    )
+    apply_button = ""
+    if details["has_apply"]:
+        apply_button = f'<button class="jobs-apply-button" onclick="window.open(\'/apply/{job_id}\')">Apply</button>'
+    body = f"""
+    {asset_html}
+    <h1><a href="/jobs/view/{job_id}/">{escape(details["title"])}</a></h1>
+    <div class="job-details-jobs-unified-top-card__primary-description-container"><div>
+        <a>{escape(details["company"])}</a><span> · </span>{escape(details["location"])}<span> · </span>
+        <span>{details["post_time"]}</span><span> · </span><span>{details["applicants"]} applicants</span>
+    </div></div>
+    {apply_button}
+    <span onclick="openSkills()">Show all skills</span>
+    <div id="modal"></div>
+    <script>
+    function openSkills() {{
+        document.getElementById("modal").innerHTML =
+            '<ul class="job-details-skill-match-status-list">' + {skills!r} + '</ul>' +
+            '<span onclick="closeSkills()">Done</span>';
+    }}
+    function closeSkills() {{ document.getElementById("modal").innerHTML = ""; }}
+    </script>
+    """
+    return page(f"{details['title']} | {details['company']} | LinkedIn", body)
+
+def heavy_assets_html(n_assets:int=5) -> str:
+    """
+    References images, fonts, a video, a stylesheet and a tracking-like script, like
+    the real job pages do
+    """
+    tags = []
+    for i in range(n_assets):
+        tags.append(f'<img src="/assets/{i}.png"><img src="/assets/{i}.jpg">')
+    tags.append('<link rel="stylesheet" href="/assets/0.css">')
+    tags.append('<style>@font-face {font-family: f; src: url(/assets/0.woff2);} body {font-family: f;}</style>')
+    tags.append('<video src="/assets/0.mp4" autoplay muted></video>')
+    tags.append('<script src="/li/track/assets/0.js"></script>')
+    return "".join(tags)
+
+def apply_page(job_id:int) -> str:
+    return page("Apply", f"<h1>Apply to job {job_id}</h1>")
+
+
+class FakeLinkedIn():
+    """
+    Runs the stand-in server on a background thread.
+    'latency' adds a delay to every response to mimic a remote server.
+    'asset_html' is inserted in every job page (e.g. heavy images, fonts and scripts).
+    """
+    def __init__(self, corpus_size:int=100, latency:float=0, host:str="127.0.0.1", port:int=0,
+            asset_html:str="", asset_size:int=256*1024) -> None:
+        self.corpus_size = corpus_size
+        self.latency = latency
+        self.asset_html = asset_html
+        self.asset_size = asset_size
+        self.n_requests = 0
+        self.n_asset_requests = 0
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = Thread(target=self.server.serve_forever, name="fake-linkedin", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def external_url(self) -> str:
+        """
+        The same server under another host name, for the external apply pages. The
+        scrapper doesn't take a redirect within LinkedIn for an apply link
+        """
+        port = self.server.server_address[1]
+        return f"http://localhost:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def route(self, path:str, query:dict) -> tuple[int, str, str|bytes]:
+        """
+        Returns (status, content type, body) of a request. The body of a redirect is its location
+        """
+        if path in ("", "/", "/feed", "/feed/"):
+            return 200, "text/html", home_page()
+        if path.rstrip("/") == "/jobs/search":
+            start = int(query.get("start", ["0"])[0])
+            return 200, "text/html", search_page(start, self.corpus_size)
+        match = job_view_pattern.match(path)
+        if match:
+            return 200, "text/html", job_page(int(match[1]), self.asset_html)
+        match = external_apply_pattern.match(path)
+        if match:
+            if job_details(int(match[1]))["has_apply"]:
+                return 302, "text/html", f"{self.external_url}/apply/{match[1]}"
+            return 404, "text/html", page("Not Found", "<h1>Not Found</h1>")
+        match = apply_pattern.match(path)
+        if match:
+            return 200, "text/html", apply_page(int(match[1]))
+        match = asset_pattern.match(path.replace("/li/track", ""))
+        if match:
+            self.n_asset_requests += 1
+            return 200, ASSET_CONTENT_TYPES.get(match[1], "application/octet-stream"), bytes(self.asset_size)
+        return 404, "text/html", page("Not Found", "<h1>Not Found</h1>")
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake.n_requests += 1
+                if fake.latency > 0:
+                    sleep(fake.latency)
+                url = urlparse(self.path)
+                status, content_type, body = fake.route(url.path, parse_qs(url.query))
+                data = body.encode() if isinstance(body, str) else body
+                self.send_response(status)
+                if status in (301, 302):
+                    self.send_header("Location", body)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    server = FakeLinkedIn(corpus_size=100)
+    print(f"Serving a fake LinkedIn at {server.url}")
+    server.thread.run()
@@ -2,18 +2,26 @@ import sys
 import dotenv
 import os
 import yaml
-import psutil
-import subprocess
-from multiprocessing import Process
+from multiprocessing import Process, Queue
+from queue import Empty
 from logging import Logger, config, getLogger
 from pathlib import Path
 from time import sleep
 from ast import literal_eval
-from src.scrapper import Scrapper
-from src.db import DB
-from src.utils import ScrapperException
-from src.contracts import JobData, Singleton
+from itertools import chain
+from typing import TYPE_CHECKING
+from src.contracts import Singleton
+from src.metrics import set_metrics, metrics_from_env
+from src.governor import ResourceGovernor, Throttle
 
+# The scrapper's modules (selenium, lxml, requests, the matchers, ...) are imported by the
+# scrapper process only, at the point of use. The monitor process never needs them
+if TYPE_CHECKING:
+    from src.db import DB
+    from src.scrapper import Scrapper
+
+# The refresh budget of REFRESH_ONLY runs if REFRESH_BUDGET is not set
+DEFAULT_REFRESH_ONLY_BUDGET = 500
 
 # Config the logger. ** Must be done before all logging initializations
 logging_config_file_name = "src/logging_local.yml"
@@ -24,7 +32,6 @@ dotenv.load_dotenv(".env")
 
 class Runner(metaclass=Singleton):
     _logger: Logger
-    _job_data: JobData
 
     def __init__(self):
         # Initialize logger config
@@ -36,24 +43,152 @@ class Runner(metaclass=Singleton):
             Path(folder).mkdir(exist_ok=True)
         # Get the specific logger for scrapper #TODO: We later get specific logs for each component
         self._logger = getLogger("scrape")
-        # Initialize database
-        self._job_data = DB(db_name=os.environ["DB_NAME"],output_folder=os.environ['OUTPUT_FOLDER'])
-    
-    def run_scrapper(self):
+        # Hot-path metrics go to the StatsD listener of the CloudWatch agent if it's set
+        set_metrics(metrics_from_env(os.environ.get("STATSD_HOST"),int(os.environ.get("STATSD_PORT",8125))))
+
+    def open_db(self) -> "DB":
+        from src.db import DB
+        return DB(
+            db_name=os.environ["DB_NAME"],
+            output_folder=os.environ['OUTPUT_FOLDER'],
+            flush_size=int(os.environ.get("DB_FLUSH_SIZE",50)),
+            flush_interval=float(os.environ.get("DB_FLUSH_INTERVAL",30)),
+            synchronous=os.environ.get("DB_SYNCHRONOUS","NORMAL"), # type: ignore
+            logger=self._logger
+        )
+
+    def run_scrapper(self, throttle:Throttle|None=None):
         self._logger.info("---------------- Start a new crawl process ----------------")
-        # Initialize scrapper
-        scrapper = Scrapper(
-            job_data=self._job_data,
+        n_workers = int(os.environ.get('SCHEDULER_WORKERS',1))
+        if literal_eval(os.environ.get('REFRESH_ONLY','False')):
+            self.run_refresh(throttle)
+        elif n_workers <= 1:
+            self.run_worker(0,None,throttle)
+        else:
+            self.run_workers(n_workers,throttle)
+
+    def run_workers(self, n_workers:int, throttle:Throttle|None=None):
+        # The queries are handed out to the workers, highest yield first
+        queue = Queue()
+        job_data = self.open_db()
+        for query in self.query_scheduler(job_data).order(literal_eval(os.environ['QUERIES'])):
+            queue.put(query)
+        job_data.conn.close()
+        workers = [Process(target=self.run_worker,args=(worker_id,queue,throttle)) for worker_id in range(n_workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        exitcode = max(worker.exitcode or 0 for worker in workers)
+        self._logger.info(f"All {n_workers} scrapper workers are finished. Exit code {exitcode}")
+        sys.exit(exitcode)
+
+    def query_scheduler(self, job_data):
+        from src.scheduler import QueryScheduler
+        return QueryScheduler(job_data,self._logger,float(os.environ.get('QUERY_YIELD_DAYS',14)))
+
+    @staticmethod
+    def iter_queue(queue):
+        while True:
+            try:
+                yield queue.get(timeout=1)
+            except Empty:
+                return
+
+    def make_scrapper(self, user_data_dir:str, throttle:Throttle|None=None) -> "Scrapper":
+        from src.scrapper import Scrapper
+        return Scrapper(
             max_n_jobs=int(os.environ['MAX_NUMBER_OF_JOBS']),
             logger=self._logger,
             headless=literal_eval(os.environ['HEADLESS']),
             load_timeout=int(os.environ['LOAD_TIMEOUT']),
-            user_data_dir=os.environ['CHROME_PROFILE']
+            user_data_dir=user_data_dir,
+            n_workers=int(os.environ.get('N_WORKERS',1)),
+            wait_timeouts=literal_eval(os.environ.get('WAIT_TIMEOUTS','None')),
+            checkpoint_interval=float(os.environ.get('CHECKPOINT_INTERVAL',10)),
+            checkpoint_every=int(os.environ.get('CHECKPOINT_EVERY',20)),
+            incremental=literal_eval(os.environ.get('INCREMENTAL_CRAWL','False')),
+            max_known_pages=int(os.environ.get('INCREMENTAL_MAX_KNOWN_PAGES',2)),
+            base_url=os.environ.get('LINKEDIN_BASE_URL','https://www.linkedin.com'),
+            lean=literal_eval(os.environ.get('LEAN_MODE','False')),
+            blocked_resources=literal_eval(os.environ.get('BLOCKED_RESOURCES','None')),
+            page_load_strategy=os.environ.get('PAGE_LOAD_STRATEGY') or None, # type: ignore
+            throttle=throttle,
+            recycle_pages=int(os.environ.get('RECYCLE_PAGES',0)),
+            recycle_rss_mb=float(os.environ.get('RECYCLE_RSS_MB',0)),
+            recycle_minutes=float(os.environ.get('RECYCLE_MINUTES',0)),
+            prewarm_driver=literal_eval(os.environ.get('PREWARM_DRIVER','False')),
+            fetch_mode=os.environ.get('FETCH_MODE','browser'), # type: ignore
+            http_pool_size=int(os.environ.get('HTTP_POOL_SIZE',8)),
+            http_skills_fallback=literal_eval(os.environ.get('HTTP_SKILLS_FALLBACK','True')),
+            defer_apply_links=literal_eval(os.environ.get('DEFER_APPLY_LINKS','False')),
+            session_vault=os.environ.get('SESSION_VAULT') or None
         )
 
+    def refresh_budget(self) -> int:
+        budget = int(os.environ.get('REFRESH_BUDGET',0))
+        if budget <= 0 and literal_eval(os.environ.get('REFRESH_ONLY','False')):
+            self._logger.warning(f"REFRESH_ONLY is set without a REFRESH_BUDGET. Refreshing up to {DEFAULT_REFRESH_ONLY_BUDGET} jobs")
+            return DEFAULT_REFRESH_ONLY_BUDGET
+        return budget
+
+    def run_worker(self, worker_id:int, queries, throttle:Throttle|None=None):
+        """
+        queries: A list of queries, None to run all the QUERIES ordered by yield or a
+            multiprocessing Queue shared with the other worker processes
+        """
+        user_data_dir = os.environ['CHROME_PROFILE']
+        shared = queries is not None and not isinstance(queries,list)
+        if shared:
+            # A process of its own, with its own backup folder and profile
+            os.environ["BACKUP_FOLDER"] = f"{os.environ['BACKUP_FOLDER']}/worker{worker_id}"
+            Path(os.environ["BACKUP_FOLDER"]).mkdir(exist_ok=True)
+            if worker_id > 0:
+                user_data_dir = f"{user_data_dir}_proc{worker_id}"
+        # Chrome starts in the background while the database and the state are loaded
+        scrapper = self.make_scrapper(user_data_dir,throttle)
+        from src.scheduler import JobClaims
+        scrapper.job_data = self.open_db()
+        scrapper.claims = JobClaims(
+            f"{os.environ['OUTPUT_FOLDER']}/{os.environ['DB_NAME']}",
+            f"worker{worker_id}",
+            lease_minutes=float(os.environ.get('CLAIM_LEASE_MINUTES',30))
+        )
+        # The query of an interrupted run goes first, the scrapper skips the others until then
+        resume_query = scrapper.state["query"] if scrapper.state else None
+        if queries is None:
+            queries = self.query_scheduler(scrapper.job_data).order(literal_eval(os.environ['QUERIES']),resume_query)
+        elif shared:
+            queries = self.iter_queue(queries) # type: ignore
+            if resume_query is not None:
+                queries = chain([resume_query],(query for query in queries if query != resume_query))
+
         # Run
         scrapper.sign_in()
-        for keyword in literal_eval(os.environ['QUERIES']):
+        if throttle is not None:
+            # The monitor waits for the checkpoint of every registered process
+            throttle.register()
+        try:
+            self.run_queries(scrapper,queries)
+        finally:
+            if throttle is not None:
+                throttle.unregister()
+        # The refresh of the stored jobs has a budget of its own. One worker is enough
+        if worker_id == 0:
+            self.refresh_stored_jobs(scrapper)
+        # The apply links left pending by the scraping. One worker is enough
+        if worker_id == 0:
+            try:
+                scrapper.resolve_apply_links(literal_eval(os.environ.get('APPLY_LINK_BROWSER_FALLBACK','True')))
+            except Exception as e:
+                self._logger.error(f"Error resolving the apply links. They are kept for the next run: {e}")
+        self._logger.info("---------------- Crawl process finished successfully! ----------------")
+        scrapper.claims.close()
+        scrapper.quit()
+
+    def run_queries(self, scrapper:"Scrapper", queries):
+        from src.utils import ScrapperException
+        for keyword in queries:
             for _ in range(100):
                 try:
                     scrapper.manage_and_run(keyword)
@@ -71,61 +206,62 @@ class Runner(metaclass=Singleton):
                         case _:
                             self._logger.critical(f"Unknown error occurred from scrapper. Exiting!")
                             sys.exit(1)
-        self._logger.info("---------------- Crawl process finished successfully! ----------------")
-        scrapper.driver.quit()
-        sys.exit(0)
-
-def run_cpulimit(file_path:str="/home/ubuntu/cpulimit-all.sh",proc_name="chrome",cpu_pct=20):
-    if not os.path.exists(file_path):
-        print(f"cpu_limit file path does not exist. path:{file_path}")
-        return None
-    command = ["bash",file_path,"-l",str(cpu_pct),"-e",proc_name,"--max-depth=3","--watch-interval=2","-q"]
-    try:
-        proc = subprocess.Popen(command,shell=False,stderr=subprocess.PIPE,stdout=subprocess.DEVNULL)
-    except:
-        # if the command is invalid or the file doesn't exist it throws an error
-        return None
-    # Check if we got errors from stderr
-    # if proc.stderr.readline()!=b"":
-    #     proc.kill()
-    #     return None
-    return proc
+
+    def refresh_stored_jobs(self, scrapper:"Scrapper"):
+        try:
+            scrapper.refresh_jobs(
+                self.refresh_budget(),
+                literal_eval(os.environ.get('REFRESH_SCHEDULE','None')),
+                literal_eval(os.environ.get('REFRESH_BROWSER_FALLBACK','False'))
+            )
+        except Exception as e:
+            self._logger.error(f"Error refreshing the stored jobs: {e}")
+
+    def run_refresh(self, throttle:Throttle|None=None):
+        """
+        Only refreshes the stored jobs: no queries, no job claims and no apply links
+        """
+        scrapper = self.make_scrapper(os.environ['CHROME_PROFILE'],throttle)
+        scrapper.job_data = self.open_db()
+        try:
+            # The refresh fetches the pages with the cookies of the signed-in browser
+            scrapper.sign_in()
+            self.refresh_stored_jobs(scrapper)
+        finally:
+            scrapper.quit()
+        self._logger.info("---------------- Refresh process finished ----------------")
 
 def run_with_proc_monitor():
     runner = Runner()
     logger = getLogger("procmon")
-    cpu_limit_process = None
+    throttle = Throttle()
     high_cpu_threshold = float(os.environ['HIGH_CPU_THRESHOLD'])
+    governor = None
     if high_cpu_threshold > 0:
-        logger.info("Initializing cpulimit")
-        cpu_limit_process = run_cpulimit("/home/ubuntu/cpulimit-all.sh")
-        if cpu_limit_process is None:
-            logger.error("Error in running cpulimit!")
+        logger.info("Initializing the resource governor")
+        governor = ResourceGovernor(
+            throttle,
+            logger,
+            cpu_high=high_cpu_threshold,
+            cpu_low=float(os.environ.get('LOW_CPU_THRESHOLD',high_cpu_threshold/2)),
+            rss_limit_mb=float(os.environ.get('MAX_RSS_MB',0)),
+            max_delay=float(os.environ.get('MAX_PAGE_DELAY',5)),
+            max_overload_count=int(os.environ['MAX_HIGH_CPU_COUNT'])
+        )
     for r in range(int(os.environ['MAX_SCRAPPER_RESTART_ATTEMPTS'])):
         logger.info(f"Attempt number {r+1} in starting the process")
-        p = Process(target=runner.run_scrapper)
+        p = Process(target=runner.run_scrapper,args=(throttle,))
         p.start()
-        sleep(5)
-        count = 0
         while p.is_alive():
-            if high_cpu_threshold > 0  and psutil.cpu_percent(0.5) > high_cpu_threshold:
-                count += 1
-                logger.warning(f"Detected high cpu usage. Count={count}")
-            else:
-                count = 0
-            if count > int(os.environ['MAX_HIGH_CPU_COUNT']):
-                print("High cpu threshold exceeded. Killing the process")
-                for proc in psutil.process_iter():
-                    if proc.name().find("chrome"):
-                        proc.kill()
-                p.kill()
-        sleep(5)
-        if p.exitcode and p.exitcode >= 0:
-            logger.info("Process is exited without a problem")
+            sleep(2)
+            if governor is not None and p.pid is not None and governor.step(p.pid) == "restart":
+                logger.warning("Resource usage is still high after throttling. Restarting the scrapper")
+                governor.restart(p)
+        p.join()
+        # A negative exit code means the process is killed by a signal (e.g. restarted)
+        if p.exitcode is not None and p.exitcode >= 0:
+            logger.info(f"Process is exited with code {p.exitcode}")
             break
-    if cpu_limit_process is not None:
-        logger.info("Stopping cpulimit")
-        cpu_limit_process.kill()
     logger.info("Done")
 
 
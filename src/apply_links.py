@@ -0,0 +1,112 @@
+"""
+Resolves the external apply links of the stored jobs after the scraping is done.
+Opening the external site of every job in a browser tab stalls the scraping, so the
+scrapper only stores a pending marker (APPLY_LINK_PENDING) and this stage follows the
+apply redirects of LinkedIn over HTTP, several jobs at a time. The jobs it can't resolve
+over HTTP can be handed to a (slower) browser fallback.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from logging import Logger
+from typing import Callable
+from urllib.parse import urlparse
+import requests
+from .contracts import JobData
+from . import metrics
+
+# Marks a job that couldn't be resolved (kept pending)
+_UNRESOLVED = object()
+
+
+class ApplyLinkResolver():
+	"""
+	session: A requests.Session with the cookies of the signed-in user (see HttpFetcher)
+	fallback: Called with the job id of the jobs that can't be resolved over HTTP. Returns
+		the apply link or None. It runs on the caller's thread, one job at a time
+	"""
+	def __init__(
+			self,
+			job_data:JobData,
+			session:requests.Session,
+			base_url:str,
+			logger:Logger,
+			batch_size:int=50,
+			concurrency:int=8,
+			timeout:float=15,
+			fallback:Callable[[int],str|None]|None=None
+			) -> None:
+		self.job_data = job_data
+		self.session = session
+		self.base_url = base_url.rstrip("/")
+		# The redirects within LinkedIn (e.g. to the sign-in page) are not apply links
+		self.base_domain = (urlparse(self.base_url).hostname or "").removeprefix("www.")
+		self.logger = logger
+		self.batch_size = batch_size
+		self.concurrency = concurrency
+		self.timeout = timeout
+		self.fallback = fallback
+
+	def redirect_url(self, job_id:int) -> str:
+		return f"{self.base_url}/jobs/view/externalApply/{job_id}"
+
+	def is_external(self, url:str) -> bool:
+		host = urlparse(url).hostname or ""
+		return host != self.base_domain and not host.endswith("." + self.base_domain)
+
+	def resolve(self, job_id:int):
+		"""
+		Follows the apply redirect of the job without downloading the external page.
+		Returns the external URL, None if the job has no external apply link or _UNRESOLVED
+		"""
+		try:
+			with self.session.get(self.redirect_url(job_id),timeout=self.timeout,allow_redirects=True,stream=True) as response:
+				if len(response.history) > 0:
+					if self.is_external(response.url):
+						return response.url
+					self.logger.debug(f"The apply redirect of job {job_id} stays on LinkedIn: {response.url}")
+					return _UNRESOLVED
+				if response.status_code == 404:
+					return None
+				self.logger.debug(f"No apply redirect for job {job_id}: HTTP {response.status_code}")
+		except requests.RequestException as e:
+			self.logger.debug(f"Error resolving the apply link of job {job_id}: {e}")
+		return _UNRESOLVED
+
+	def resolve_batch(self, job_ids:list[int], executor:ThreadPoolExecutor) -> dict[int,str|None]:
+		resolved = {}
+		for job_id, apply_link in zip(job_ids,executor.map(self.resolve,job_ids)):
+			if apply_link is _UNRESOLVED and self.fallback is not None:
+				metrics.incr("apply_links.fallbacks")
+				try:
+					apply_link = self.fallback(job_id)
+				except Exception as e:
+					self.logger.warning(f"Error resolving the apply link of job {job_id} in the browser: {e}")
+			if apply_link is _UNRESOLVED:
+				metrics.incr("apply_links.unresolved")
+				continue
+			resolved[job_id] = apply_link
+		return resolved
+
+	def run(self, max_batches:int|None=None) -> int:
+		"""
+		Resolves the pending apply links batch by batch and writes each batch at once.
+		The jobs that stay unresolved are kept pending for the next run.
+		Returns the number of resolved jobs
+		"""
+		n_resolved = 0
+		after_job_id = 0
+		n_batches = 0
+		with ThreadPoolExecutor(max_workers=self.concurrency,thread_name_prefix="apply-links") as executor:
+			while max_batches is None or n_batches < max_batches:
+				job_ids = self.job_data.pending_apply_links(self.batch_size,after_job_id)
+				if len(job_ids) == 0:
+					break
+				with metrics.timer("apply_links.batch"):
+					resolved = self.resolve_batch(job_ids,executor)
+				if len(resolved) > 0:
+					self.job_data.update_apply_links(resolved)
+				metrics.incr("apply_links.resolved",len(resolved))
+				n_resolved += len(resolved)
+				after_job_id = job_ids[-1]
+				n_batches += 1
+		self.logger.info(f"Resolved {n_resolved} apply links")
+		return n_resolved
@@ -0,0 +1,63 @@
+import json
+import os
+from logging import Logger
+from time import monotonic
+
+
+class Checkpoint():
+	"""
+	Keeps the latest scrapper state in memory and writes it to the state file only when
+	asked to. The caller decides when it is safe to flush (e.g. after the job data is
+	persisted) and uses 'due' to throttle the writes by time or by number of updates.
+	The file is written to a temporary file first and then renamed, so a crash never
+	leaves a half-written state file behind.
+	"""
+	def __init__(self, path:str, logger:Logger, flush_interval:float=10, flush_every:int=20) -> None:
+		self.path = path
+		self.logger = logger
+		self.flush_interval = flush_interval
+		self.flush_every = flush_every
+		self._state: dict|None = None
+		self._n_updates = 0
+		self._last_flush = monotonic()
+
+	def read(self) -> dict|None:
+		if not os.path.exists(self.path):
+			self.logger.debug(f"No state file existed at {self.path}")
+			return None
+		with open(self.path,"r") as f:
+			state = json.load(f)
+		self.logger.debug(f"State file exists at {self.path}\nState={state}")
+		return state
+
+	def save(self, state:dict):
+		"""
+		Records the state in memory. It's written on the next 'flush'
+		"""
+		self._state = dict(state)
+		self._n_updates += 1
+
+	def due(self) -> bool:
+		if self._n_updates == 0:
+			return False
+		return self._n_updates >= self.flush_every or monotonic() - self._last_flush >= self.flush_interval
+
+	def flush(self):
+		if self._state is not None and self._n_updates > 0:
+			tmp_path = self.path + ".tmp"
+			with open(tmp_path,"w") as f:
+				json.dump(self._state,f)
+				f.flush()
+				os.fsync(f.fileno())
+			os.replace(tmp_path,self.path)
+			# Since it's too frequent we won't catch it even at debug level. We set it to sub DEBUG (<10)
+			self.logger.log(msg=f"State file is written at {self.path}",level=8)
+		self._n_updates = 0
+		self._last_flush = monotonic()
+
+	def discard(self):
+		"""
+		Forgets the unwritten state. Used when the state file is deleted
+		"""
+		self._state = None
+		self._n_updates = 0
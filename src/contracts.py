@@ -1,8 +1,11 @@
 import abc
 from datetime import datetime
-from typing import List
+from typing import List, Iterable
 import sys
 
+# Stored in 'apply_link' when the external apply link is left to be resolved later
+APPLY_LINK_PENDING = "pending"
+
 class Singleton(type):
     _instance = None
     def __call__(cls, *args, **kwargs):
@@ -33,6 +36,18 @@ class JobData(metaclass=abc.ABCMeta):
         ):
         raise NotImplementedError
     
+    """
+    Write many rows at once. Each row is a dict with the same keys as 'write_one' arguments.
+    Implementations may buffer the rows and persist them later. Call 'flush' to make sure
+    everything is persisted.
+    """
+    def write_many(self, rows:Iterable[dict]):
+        for row in rows:
+            self.write_one(**row)
+
+    def flush(self):
+        pass
+
     """
     Update one row in 'details' table.
     'data' format is {column1:value1, column2:value2, ...}
@@ -41,9 +56,80 @@ class JobData(metaclass=abc.ABCMeta):
     def update_one(self,job_id:int,data:dict):
         raise NotImplementedError
     
+    """
+    Update many rows in 'details' table. 'updates' format is {job_id: data} where 'data'
+    is in the format of 'update_one'. Returns the number of updated rows
+    """
+    def update_many(self,updates:dict[int,dict]) -> int:
+        return sum(1 for job_id, data in updates.items() if self.update_one(job_id,data))
+
+    """
+    Write the rows, replacing the jobs that already exist. Each row is a dict with the same
+    keys as 'write_one' arguments. Returns the number of written rows
+    """
+    def upsert_many(self,rows:Iterable[dict]) -> int:
+        n = 0
+        for row in rows:
+            data = {k:v for k,v in row.items() if k not in ("job_id","li_job_link","original_query","crawl_time")}
+            if not self.update_one(row["job_id"],data):
+                self.write_one(**row)
+            n += 1
+        return n
+
     @abc.abstractmethod
     def get_one(self,job_id:int) -> dict|None:
         raise NotImplementedError
     
     def exists(self, job_id:int):
-        return self.get_one(job_id) is not None
\ No newline at end of file
+        return self.get_one(job_id) is not None
+
+    """
+    Returns the last time 'original_query' was crawled or None if it has never been crawled
+    """
+    def last_crawl_time(self, original_query:str) -> datetime|None:
+        return None
+
+    """
+    Records that 'n_pages' search pages of 'original_query' are crawled at 'crawl_time'
+    """
+    def record_crawl(self, original_query:str, crawl_time:datetime, n_pages:int):
+        pass
+
+    """
+    Returns the new jobs found per crawled search page of each query crawled since 'since'.
+    The queries without any recorded crawl are left out
+    """
+    def query_yields(self, since:datetime) -> dict[str,float]:
+        return {}
+
+    """
+    Returns up to 'limit' job ids that are due for a refresh at 'now', the longest waiting
+    first. 'schedule' is a list of (maximum age of the job, refresh interval) in hours
+    """
+    def due_refreshes(self, schedule:list[tuple[float,float]], now:datetime, limit:int) -> list[int]:
+        return []
+
+    """
+    Appends the refreshed snapshots of the jobs to their history. Each snapshot is a dict
+    with the keys: job_id, time, n_applicants and is_expired
+    """
+    def add_history(self, snapshots:list[dict]):
+        pass
+
+    """
+    Returns the subset of 'job_ids' that already exist
+    """
+    def exists_many(self, job_ids:Iterable[int]) -> set[int]:
+        return {int(job_id) for job_id in job_ids if self.exists(job_id)}
+
+    """
+    Returns up to 'limit' job ids, greater than 'after_job_id', whose apply link is pending
+    """
+    def pending_apply_links(self, limit:int=100, after_job_id:int=0) -> list[int]:
+        return []
+
+    """
+    Writes the resolved apply links. 'links' format is {job_id: apply_link}
+    """
+    def update_apply_links(self, links:dict[int,str|None]):
+        self.update_many({job_id:{"apply_link":apply_link} for job_id, apply_link in links.items()})
\ No newline at end of file
@@ -1,18 +1,116 @@
+import csv
+import json
 import sqlite3
 from pathlib import Path
-from typing import List
+from typing import Iterable, Iterator, List, Literal
 from datetime import datetime
-from .contracts import JobData
-from functools import lru_cache
+from time import monotonic
+from logging import Logger, getLogger
+from .contracts import JobData, APPLY_LINK_PENDING
+from .id_index import IdIndex
+from . import metrics
+from .dimensions import Dimension
+from contextlib import contextmanager
+
+INSERT_DETAILS_QUERY = """
+    INSERT INTO details (job_id, title, company_id, post_time, n_applicants,
+    location, is_repost, apply_link, post_time_raw,
+    crawl_time_id, original_query_id, match_score, top_matches, match_threshold)
+    VALUES (?, ?, ?, datetime(?), ?, ?, ?, ?, ?, ?, ?, ?, json(?), ?)
+"""
+
+# On conflict, a job keeps the query and the crawl time it was first found with
+UPSERT_DETAILS_QUERY = INSERT_DETAILS_QUERY.rstrip() + """
+    ON CONFLICT(job_id) DO UPDATE SET
+    title = excluded.title, company_id = excluded.company_id, post_time = excluded.post_time,
+    n_applicants = excluded.n_applicants, location = excluded.location,
+    is_repost = excluded.is_repost, apply_link = excluded.apply_link,
+    post_time_raw = excluded.post_time_raw, match_score = excluded.match_score,
+    top_matches = excluded.top_matches, match_threshold = excluded.match_threshold
+"""
+
+# The columns 'update_many' can set and their placeholders. 'skills' and 'company_name'
+# are handled separately
+UPDATE_COLUMNS = {
+    "title": "?",
+    "post_time": "datetime(?)",
+    "n_applicants": "?",
+    "location": "?",
+    "is_repost": "?",
+    "apply_link": "?",
+    "post_time_raw": "?",
+    "match_score": "?",
+    "top_matches": "json(?)",
+    "match_threshold": "?"
+}
+
+INSERT_JOB_SKILL_QUERY = "INSERT OR IGNORE INTO job_skill (job_id, skill_id) VALUES (?, ?)"
+
+# The skills of a job as a comma separated list, like they were stored in 'details.skills'
+SKILLS_COLUMN = """(
+    SELECT group_concat(s.name, ',') FROM job_skill AS js
+    JOIN skill AS s ON js.skill_id = s.id
+    WHERE js.job_id = d.job_id
+)"""
+
+# Columns of 'query_jobs' and of the exports
+JOB_COLUMNS = {
+    "job_id": "d.job_id",
+    "title": "d.title",
+    "company_name": "c.name",
+    "post_time": "d.post_time",
+    "n_applicants": "d.n_applicants",
+    "location": "d.location",
+    "skills": SKILLS_COLUMN,
+    "is_repost": "d.is_repost",
+    "apply_link": "d.apply_link",
+    "post_time_raw": "d.post_time_raw",
+    "crawl_time": "t.time",
+    "original_query": "o.query",
+    "match_score": "d.match_score",
+    "top_matches": "d.top_matches",
+    "match_threshold": "d.match_threshold"
+}
 
 
 class DB(JobData):
-    def __init__(self, db_name:str,output_folder:str=".") -> None:
+    def __init__(
+            self,
+            db_name:str,
+            output_folder:str=".",
+            flush_size:int=50,
+            flush_interval:float=30,
+            synchronous:Literal["OFF","NORMAL","FULL","EXTRA"]="NORMAL",
+            logger:Logger|None=None
+            ) -> None:
+        """
+        flush_size: Number of buffered rows (see 'write_many') that triggers a flush
+        flush_interval: Seconds after the last flush that triggers a flush on the next write
+        synchronous: SQLite 'synchronous' pragma. NORMAL is safe in WAL mode but the last
+            transactions may roll back after a power loss
+        """
+        self.logger = logger if logger else getLogger()
         if output_folder != ".":
             Path(output_folder).mkdir(exist_ok=True)
         self.conn = sqlite3.connect(f"{output_folder}/{db_name}")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={synchronous}")
         self.cursor = self.conn.cursor()
         self.create_tables()
+        # The dimension tables are interned in memory. See 'transaction'
+        self.companies = Dimension(self.conn,"company","name")
+        self.original_queries = Dimension(self.conn,"original_query","query")
+        self.crawl_times = Dimension(self.conn,"crawl_time","time","datetime(?)")
+        self.skills = Dimension(self.conn,"skill","name")
+        self._transaction_depth = 0
+        self.migrate_skills()
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._buffer: List[dict] = []
+        self._buffered_ids: set[int] = set()
+        self._last_flush = monotonic()
+        # All job ids stored (or buffered) in the database. Used to answer 'exists' in memory
+        self.job_ids = self.load_job_ids()
 
     def create_tables(self):
 
@@ -29,6 +127,10 @@ class DB(JobData):
             id INTEGER PRIMARY KEY,
             name TEXT NOT NULL
         );
+        CREATE TABLE IF NOT EXISTS skill (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
         CREATE TABLE IF NOT EXISTS details (
             id INTEGER PRIMARY KEY,
             job_id INTEGER NOT NULL UNIQUE,
@@ -47,7 +149,37 @@ class DB(JobData):
             top_matches JSONB,
             match_threshold INT
         );
-        """
+        CREATE TABLE IF NOT EXISTS job_skill (
+            job_id INTEGER NOT NULL REFERENCES details(job_id),
+            skill_id INTEGER NOT NULL REFERENCES skill(id),
+            PRIMARY KEY (job_id, skill_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS query_crawl (
+            original_query_id INTEGER NOT NULL REFERENCES original_query(id),
+            crawl_time_id INTEGER NOT NULL REFERENCES crawl_time(id),
+            n_pages INTEGER NOT NULL,
+            PRIMARY KEY (original_query_id, crawl_time_id)
+        );
+        CREATE INDEX IF NOT EXISTS details_query_crawl_time ON details(original_query_id, crawl_time_id);
+        CREATE TABLE IF NOT EXISTS details_history (
+            job_id INTEGER NOT NULL REFERENCES details(job_id),
+            time TEXT NOT NULL,
+            n_applicants INTEGER,
+            is_expired INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (job_id, time)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS job_skill_skill ON job_skill(skill_id, job_id);
+        CREATE INDEX IF NOT EXISTS details_legacy_skills ON details(job_id)
+            WHERE skills IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS details_pending_apply_link ON details(job_id)
+            WHERE apply_link = '%s';
+        CREATE INDEX IF NOT EXISTS details_post_time ON details(post_time);
+        CREATE INDEX IF NOT EXISTS details_company_post_time ON details(company_id, post_time);
+        CREATE INDEX IF NOT EXISTS details_query_post_time ON details(original_query_id, post_time);
+        CREATE INDEX IF NOT EXISTS details_match_score ON details(match_score);
+        CREATE INDEX IF NOT EXISTS company_name ON company(name);
+        CREATE INDEX IF NOT EXISTS original_query_query ON original_query(query);
+        """ % APPLY_LINK_PENDING
         self.conn.executescript(query)
         self.conn.commit()
         # self.conn.close()
@@ -70,62 +202,119 @@ class DB(JobData):
             top_matches:list|None=None,
             match_threshold:int|None=None
             ):
+        data = self.details_row(
+            job_id, title, company_id, crawl_time_id, original_query_id,
+            post_time, n_applicants, location, is_repost, apply_link,
+            post_time_raw, match_score, top_matches, match_threshold
+        )
+        with self.transaction():
+            self.conn.execute(INSERT_DETAILS_QUERY,data)
+            self.conn.executemany(INSERT_JOB_SKILL_QUERY,self.job_skill_rows(job_id,skills))
+        self.job_ids.add(job_id)
 
-        skills_str = None if (skills is None or len(skills)==0) else ",".join(skills)
-        if top_matches is None:
-            top_matches_str = "NULL"
-        else:
-            top_matches_str = "json_array('"+"','".join(top_matches)+"')"
-        insert_query = f"""
-            INSERT INTO details (job_id, title, company_id, post_time, n_applicants,
-            location, skills, is_repost, apply_link, post_time_raw,
-            crawl_time_id, original_query_id, match_score, top_matches, match_threshold)
-            VALUES (?, ?, ?, datetime(?), ?, ?, ?, ?, ?, ?, ?, ?, ?, {top_matches_str}, ?)
-        """
-        data = (
+    @staticmethod
+    def details_row(
+            job_id:int,
+            title:str,
+            company_id:int,
+            crawl_time_id:int,
+            original_query_id:int,
+            post_time:datetime|None=None,
+            n_applicants:int|None=None,
+            location:str|None=None,
+            is_repost:bool=False,
+            apply_link:str|None=None,
+            post_time_raw:str|None=None,
+            match_score:int|None=None,
+            top_matches:list|None=None,
+            match_threshold:int|None=None
+            ) -> tuple:
+        """
+        Builds the parameters of INSERT_DETAILS_QUERY in the same order as its columns.
+        The skills are stored in 'job_skill' (see 'job_skill_rows')
+        """
+        top_matches_str = None if top_matches is None else json.dumps(top_matches)
+        return (
             job_id, title, company_id, post_time, n_applicants,
-            location, skills_str, is_repost, apply_link, post_time_raw,
-            crawl_time_id, original_query_id, match_score, match_threshold
+            location, is_repost, apply_link, post_time_raw,
+            crawl_time_id, original_query_id, match_score, top_matches_str, match_threshold
         )
-        self.conn.execute(insert_query,data)
-        self.conn.commit()
 
-    @lru_cache(maxsize=10)
-    def get_original_query_id(self,original_query:str):
-
-        self.cursor.execute("SELECT id FROM original_query WHERE query= ?",(original_query,))
-        id = self.cursor.fetchone()
-        if id is None:
-            self.cursor.execute("INSERT INTO original_query (query) VALUES (?)",(original_query,))
-            self.conn.commit()
-            self.cursor.execute("SELECT id FROM original_query WHERE query= ?",(original_query,))
-            id = self.cursor.fetchone()
-        return id[0]
-
-    @lru_cache(maxsize=10)
-    def get_crawl_time_id(self,crawl_time:datetime):
-        crawl_time_str = crawl_time.strftime('%Y-%m-%d %H:00:00')
-        self.cursor.execute("SELECT id FROM crawl_time WHERE time= datetime(?)",(crawl_time_str,))
-        id = self.cursor.fetchone()
-        if id is None:
-            self.cursor.execute("INSERT INTO crawl_time (time) VALUES (datetime(?))",(crawl_time_str,))
-            self.conn.commit()
-            self.cursor.execute("SELECT id FROM crawl_time WHERE time= datetime(?)",(crawl_time_str,))
-            id = self.cursor.fetchone()
-        return id[0]
-
-    @lru_cache(maxsize=500)
-    def get_company_id(self,company_name:str):
-
-        self.cursor.execute("SELECT id FROM company WHERE name=?",(company_name,))
-        id = self.cursor.fetchone()
-        if id is None:
-            self.cursor.execute("INSERT INTO company (name) VALUES (?)",(company_name,))
-            self.conn.commit()
-            self.cursor.execute("SELECT id FROM company WHERE name= ?",(company_name,))
-            id = self.cursor.fetchone()
-        return id[0]
-    
+    def job_skill_rows(self, job_id:int, skills:Iterable[str]|None) -> List[tuple]:
+        """
+        Builds the parameters of INSERT_JOB_SKILL_QUERY for the skills of a job
+        """
+        if skills is None:
+            return []
+        names = {skill.strip() for skill in skills} - {""}
+        return [(int(job_id),self.get_skill_id(name)) for name in sorted(names)]
+
+    @contextmanager
+    def transaction(self):
+        """
+        Commits on exit or rolls back on error. The dimension values inserted inside it
+        are only cached once they're committed. Nested calls join the outer transaction
+        """
+        if self._transaction_depth > 0:
+            self._transaction_depth += 1
+            try:
+                yield
+            finally:
+                self._transaction_depth -= 1
+            return
+        self._transaction_depth = 1
+        dimensions = [self.companies,self.original_queries,self.crawl_times,self.skills]
+        try:
+            with self.conn:
+                yield
+        except BaseException:
+            for dimension in dimensions:
+                dimension.rollback()
+            raise
+        finally:
+            self._transaction_depth = 0
+        for dimension in dimensions:
+            dimension.commit()
+
+    def get_original_query_id(self,original_query:str) -> int:
+        return self.original_queries.get_id(original_query)
+
+    def get_crawl_time_id(self,crawl_time:datetime) -> int:
+        return self.crawl_times.get_id(crawl_time.strftime('%Y-%m-%d %H:00:00'))
+
+    def get_company_id(self,company_name:str) -> int:
+        return self.companies.get_id(company_name)
+
+    def get_skill_id(self,skill_name:str) -> int:
+        return self.skills.get_id(skill_name)
+
+    def migrate_skills(self, chunk_size:int=1000) -> int:
+        """
+        Moves the comma separated skills of the 'details.skills' column (written by the older
+        versions) to 'job_skill' and clears the column. Returns the number of migrated jobs
+        """
+        n = 0
+        while True:
+            self.cursor.execute(
+                "SELECT job_id, skills FROM details WHERE skills IS NOT NULL LIMIT ?",
+                (chunk_size,)
+            )
+            rows = self.cursor.fetchall()
+            if len(rows) == 0:
+                break
+            with self.transaction():
+                job_skills = []
+                for job_id,skills in rows:
+                    job_skills += self.job_skill_rows(job_id,skills.split(","))
+                self.conn.executemany(INSERT_JOB_SKILL_QUERY,job_skills)
+                self.conn.executemany(
+                    "UPDATE details SET skills = NULL WHERE job_id = ?",
+                    [(job_id,) for job_id,_ in rows]
+                )
+            n += len(rows)
+        return n
+
+    @metrics.timed("db.write_one")
     def write_one(self,
         job_id: int,
         title: str,
@@ -143,34 +332,112 @@ class DB(JobData):
         top_matches: List | None = None,
         match_threshold: int | None = None
         ):
-        company_id = self.get_company_id(company_name)
-        original_query_id = self.get_original_query_id(original_query)
-        crawl_time_id = self.get_crawl_time_id(crawl_time)
-        self.insert_details(
-            job_id,
-            title,
-            company_id,           
-            crawl_time_id,
-            original_query_id,
-            post_time,
-            n_applicants,
-            location,
-            skills,
-            is_repost,
-            apply_link,
-            post_time_raw,
-            match_score,
-            top_matches,
-            match_threshold
-        )
+        with self.transaction():
+            self.insert_details(
+                job_id,
+                title,
+                self.get_company_id(company_name),
+                self.get_crawl_time_id(crawl_time),
+                self.get_original_query_id(original_query),
+                post_time,
+                n_applicants,
+                location,
+                skills,
+                is_repost,
+                apply_link,
+                post_time_raw,
+                match_score,
+                top_matches,
+                match_threshold
+            )
+
+    @metrics.timed("db.write_many")
+    def write_many(self, rows: Iterable[dict]):
+        """
+        Buffers the rows and writes them in a single transaction once the buffer is
+        larger than 'flush_size' or 'flush_interval' seconds has passed since the last flush.
+        The jobs that are already stored or buffered are skipped
+        """
+        for row in rows:
+            row = dict(row)
+            # li_job_link is part of the contract but is not stored in the details table
+            row.pop("li_job_link",None)
+            job_id = int(row["job_id"])
+            if job_id in self.job_ids:
+                continue
+            # The dimension ids are resolved in the transaction of 'flush'
+            self._buffer.append(row)
+            self._buffered_ids.add(job_id)
+            self.job_ids.add(job_id)
+        if len(self._buffer) >= self.flush_size or monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def resolve_rows(self, rows: Iterable[dict]) -> tuple[List[tuple], List[tuple]]:
+        """
+        Builds the parameters of INSERT_DETAILS_QUERY and INSERT_JOB_SKILL_QUERY for rows with
+        the keys of 'write_one' (except li_job_link). Call it inside a 'transaction', since it
+        may insert new dimension values
+        """
+        details = []
+        job_skills = []
+        for row in rows:
+            row = dict(row)
+            job_skills += self.job_skill_rows(row["job_id"],row.pop("skills",None))
+            details.append(self.details_row(
+                company_id=self.get_company_id(row.pop("company_name")),
+                original_query_id=self.get_original_query_id(row.pop("original_query")),
+                crawl_time_id=self.get_crawl_time_id(row.pop("crawl_time")),
+                **row
+            ))
+        return details, job_skills
+
+    def stored_ids(self, job_ids: Iterable[int]) -> set[int]:
+        """
+        The job ids stored in the details table, read from the database and not from the
+        index, since another process may have written them
+        """
+        job_ids = list(job_ids)
+        stored = set()
+        for i in range(0,len(job_ids),500):
+            chunk = job_ids[i:i+500]
+            self.cursor.execute(f"SELECT job_id FROM details WHERE job_id IN ({','.join('?' * len(chunk))})",chunk)
+            stored.update(row[0] for row in self.cursor.fetchall())
+        return stored
+
+    @metrics.timed("db.flush")
+    def flush(self):
+        """
+        Writes the buffered rows. The buffer is emptied even if the write fails, so a bad row
+        doesn't fail every later flush. The error is raised, so the caller doesn't record the
+        rows of the failed batch as done
+        """
+        if len(self._buffer) > 0:
+            rows, self._buffer, self._buffered_ids = self._buffer, [], set()
+            stored: set[int] = set()
+            try:
+                with self.transaction():
+                    stored = self.stored_ids(row["job_id"] for row in rows)
+                    details, job_skills = self.resolve_rows(row for row in rows if int(row["job_id"]) not in stored)
+                    self.conn.executemany(INSERT_DETAILS_QUERY,details)
+                    self.conn.executemany(INSERT_JOB_SKILL_QUERY,job_skills)
+            except sqlite3.Error as e:
+                self.logger.error(f"Dropped a batch of {len(rows)} jobs that could not be written: {e}")
+                metrics.incr("db.dropped_rows",len(rows))
+                for row in rows:
+                    if int(row["job_id"]) not in stored:
+                        self.job_ids.discard(int(row["job_id"]))
+                raise
+        self._last_flush = monotonic()
 
     def get_one(self, job_id: int) -> dict | None:
         return self.get_joined(job_id)
     
     def get_joined(self,job_id:int,include_id=False):
+        if int(job_id) in self._buffered_ids:
+            self.flush()
         q = f"""
         SELECT {'d.id,' if include_id else ''} d.job_id, d.title, c.name, d.post_time, 
-        d.n_applicants, d.location, d.skills, d.is_repost, d.apply_link,
+        d.n_applicants, d.location, {SKILLS_COLUMN} AS skills, d.is_repost, d.apply_link,
         d.post_time_raw, t.time, c.name, d.match_score,
         d.top_matches, d.match_threshold, o.query
         FROM details AS d
@@ -185,21 +452,315 @@ class DB(JobData):
             return None
         return dict(zip([column[0] for column in self.cursor.description], res))
 
-    def update_one(self, job_id: int, data: dict):
-        if not self.exists(job_id):
-            return False
-        data_stmt = ",".join([f"{k}='{v}'" for k,v in data.items()])
+    def query_jobs(
+            self,
+            post_time_from:datetime|None=None,
+            post_time_to:datetime|None=None,
+            company:str|None=None,
+            original_query:str|None=None,
+            location:str|None=None,
+            min_match_score:int|None=None,
+            is_repost:bool|None=None,
+            skill:str|None=None,
+            order_by:Literal["post_time","match_score","job_id"]="post_time",
+            descending:bool=True,
+            limit:int|None=None,
+            chunk_size:int=1000
+            ) -> Iterator[dict]:
+        """
+        Lazily yields the jobs that pass all the given filters, reading 'chunk_size' rows at a time.
+        company, original_query and skill are exact matches, location matches any part of the location.
+        post_time_from is inclusive and post_time_to is exclusive
+        """
+        self.flush()
+        where = []
+        params = []
+        if post_time_from is not None:
+            where.append("d.post_time >= datetime(?)")
+            params.append(post_time_from)
+        if post_time_to is not None:
+            where.append("d.post_time < datetime(?)")
+            params.append(post_time_to)
+        if company is not None:
+            where.append("d.company_id = (SELECT id FROM company WHERE name = ?)")
+            params.append(company)
+        if original_query is not None:
+            where.append("d.original_query_id = (SELECT id FROM original_query WHERE query = ?)")
+            params.append(original_query)
+        if location is not None:
+            where.append("instr(lower(d.location), lower(?)) > 0")
+            params.append(location)
+        if min_match_score is not None:
+            where.append("d.match_score >= ?")
+            params.append(min_match_score)
+        if is_repost is not None:
+            where.append("d.is_repost = ?")
+            params.append(is_repost)
+        if skill is not None:
+            where.append("""d.job_id IN (
+                SELECT job_id FROM job_skill WHERE skill_id = (SELECT id FROM skill WHERE name = ?)
+            )""")
+            params.append(skill)
+        if order_by not in ("post_time","match_score","job_id"):
+            raise ValueError(f"Can't order the jobs by '{order_by}'")
         q = f"""
-        UPDATE details
-        SET {data_stmt}
-        WHERE job_id = {job_id}
+        SELECT {", ".join(f"{column} AS {name}" for name,column in JOB_COLUMNS.items())}
+        FROM details AS d
+        LEFT JOIN company AS c ON d.company_id = c.id
+        LEFT JOIN original_query AS o ON d.original_query_id = o.id
+        LEFT JOIN crawl_time AS t ON d.crawl_time_id = t.id
+        {"WHERE " + " AND ".join(where) if len(where) > 0 else ""}
+        ORDER BY d.{order_by} {"DESC" if descending else "ASC"}
+        {"LIMIT ?" if limit is not None else ""}
         """
-        self.conn.execute(q)
-        self.conn.commit()
-        return True
+        if limit is not None:
+            params.append(limit)
+        # A cursor of its own, so the other methods can be used while iterating
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(q,params)
+            names = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if len(rows) == 0:
+                    break
+                for row in rows:
+                    yield dict(zip(names,row))
+        finally:
+            cursor.close()
+
+    def jobs_by_skill(self, skill:str, **filters) -> Iterator[dict]:
+        """
+        Lazily yields the jobs that require 'skill'. Takes the same filters as 'query_jobs'
+        """
+        return self.query_jobs(skill=skill,**filters)
+
+    def top_skills(
+            self,
+            n:int=20,
+            original_query:str|None=None,
+            post_time_from:datetime|None=None,
+            post_time_to:datetime|None=None
+            ) -> List[tuple[str,int]]:
+        """
+        Returns the 'n' most required skills as (skill, number of jobs), most frequent first.
+        Optionally only counts the jobs of 'original_query' and posted in [post_time_from, post_time_to)
+        """
+        self.flush()
+        where = []
+        params: list = []
+        if original_query is not None:
+            where.append("d.original_query_id = (SELECT id FROM original_query WHERE query = ?)")
+            params.append(original_query)
+        if post_time_from is not None:
+            where.append("d.post_time >= datetime(?)")
+            params.append(post_time_from)
+        if post_time_to is not None:
+            where.append("d.post_time < datetime(?)")
+            params.append(post_time_to)
+        q = f"""
+        SELECT s.name, count(*) AS n_jobs FROM job_skill AS js
+        JOIN skill AS s ON js.skill_id = s.id
+        {"JOIN details AS d ON js.job_id = d.job_id" if len(where) > 0 else ""}
+        {"WHERE " + " AND ".join(where) if len(where) > 0 else ""}
+        GROUP BY js.skill_id
+        ORDER BY n_jobs DESC, s.name
+        LIMIT ?
+        """
+        params.append(n)
+        self.cursor.execute(q,params)
+        return [(name,n_jobs) for name,n_jobs in self.cursor.fetchall()]
+
+    def export(self, path:str, file_format:Literal["csv","jsonl"]="csv", chunk_size:int=1000, **filters) -> int:
+        """
+        Streams the jobs that pass the filters of 'query_jobs' to a CSV or JSON Lines file.
+        Returns the number of exported jobs
+        """
+        n = 0
+        with open(path,"w",newline="",encoding="utf-8") as f:
+            if file_format == "csv":
+                writer = csv.DictWriter(f,fieldnames=list(JOB_COLUMNS))
+                writer.writeheader()
+                for job in self.query_jobs(chunk_size=chunk_size,**filters):
+                    writer.writerow(job)
+                    n += 1
+            elif file_format == "jsonl":
+                for job in self.query_jobs(chunk_size=chunk_size,**filters):
+                    if job["top_matches"] is not None:
+                        job["top_matches"] = json.loads(job["top_matches"])
+                    f.write(json.dumps(job) + "\n")
+                    n += 1
+            else:
+                raise ValueError(f"Unknown export format '{file_format}'")
+        return n
+
+    def update_one(self, job_id: int, data: dict):
+        return self.update_many({job_id: data}) == 1
+
+    @metrics.timed("db.update_many")
+    def update_many(self, updates: dict[int, dict]) -> int:
+        """
+        Updates the stored jobs in a single transaction. 'updates' format is
+        {job_id: {column1: value1, ...}}. The columns are those of 'write_one' except the
+        query and the crawl time. Returns the number of updated jobs
+        """
+        self.flush()
+        with self.transaction():
+            # The jobs updating the same columns share one statement
+            groups: dict[tuple, list] = {}
+            skills: dict[int, list] = {}
+            n = 0
+            # Read from the table, since other processes may have stored some of the jobs
+            stored = self.stored_ids(updates)
+            self.job_ids.update(stored)
+            for job_id, data in updates.items():
+                job_id = int(job_id)
+                data = dict(data)
+                for column in data:
+                    if column not in UPDATE_COLUMNS and column not in ("company_name","skills"):
+                        raise ValueError(f"Can't update the column '{column}'")
+                if job_id not in stored:
+                    continue
+                n += 1
+                if "company_name" in data:
+                    data["company_id"] = self.get_company_id(data.pop("company_name"))
+                if "skills" in data:
+                    skills[job_id] = data.pop("skills") or []
+                if "top_matches" in data and data["top_matches"] is not None:
+                    data["top_matches"] = json.dumps(data["top_matches"])
+                columns = tuple(sorted(data))
+                if len(columns) > 0:
+                    groups.setdefault(columns,[]).append(tuple(data[column] for column in columns) + (job_id,))
+            for columns, params in groups.items():
+                assignments = ", ".join(f"{column} = {UPDATE_COLUMNS.get(column,'?')}" for column in columns)
+                self.conn.executemany(f"UPDATE details SET {assignments} WHERE job_id = ?",params)
+            if len(skills) > 0:
+                self.conn.executemany("DELETE FROM job_skill WHERE job_id = ?",[(job_id,) for job_id in skills])
+                self.conn.executemany(INSERT_JOB_SKILL_QUERY,[
+                    row for job_id, job_skills in skills.items() for row in self.job_skill_rows(job_id,job_skills)
+                ])
+        return n
+
+    @metrics.timed("db.upsert_many")
+    def upsert_many(self, rows: Iterable[dict]) -> int:
+        """
+        Writes the rows in a single transaction, replacing the jobs that are already stored.
+        Each row has the same keys as 'write_one'. A replaced job keeps the query and the
+        crawl time it was first found with. Returns the number of written rows
+        """
+        self.flush()
+        rows = [dict(row) for row in rows]
+        for row in rows:
+            row.pop("li_job_link",None)
+        job_ids = [int(row["job_id"]) for row in rows]
+        with self.transaction():
+            details, job_skills = self.resolve_rows(rows)
+            self.conn.executemany(UPSERT_DETAILS_QUERY,details)
+            self.conn.executemany("DELETE FROM job_skill WHERE job_id = ?",[(job_id,) for job_id in job_ids])
+            self.conn.executemany(INSERT_JOB_SKILL_QUERY,job_skills)
+        self.job_ids.update(job_ids)
+        return len(details)
     
-    def exists(self, job_id: int):
-        q = "SELECT * FROM details WHERE job_id = ?"
-        self.cursor.execute(q,(job_id,))
+    def last_crawl_time(self, original_query: str) -> datetime | None:
+        q = """
+        SELECT max(t.time) FROM details AS d
+        JOIN crawl_time AS t ON d.crawl_time_id = t.id
+        JOIN original_query AS o ON d.original_query_id = o.id
+        WHERE o.query = ?;
+        """
+        self.cursor.execute(q,(original_query,))
         res = self.cursor.fetchone()
-        return res is not None
\ No newline at end of file
+        if res is None or res[0] is None:
+            return None
+        return datetime.fromisoformat(res[0])
+
+    def record_crawl(self, original_query: str, crawl_time: datetime, n_pages: int):
+        with self.transaction():
+            self.conn.execute("""
+            INSERT INTO query_crawl (original_query_id, crawl_time_id, n_pages) VALUES (?, ?, ?)
+            ON CONFLICT(original_query_id, crawl_time_id) DO UPDATE SET n_pages = n_pages + excluded.n_pages
+            """,(self.get_original_query_id(original_query),self.get_crawl_time_id(crawl_time),n_pages))
+
+    def query_yields(self, since: datetime) -> dict[str, float]:
+        self.flush()
+        q = """
+        SELECT o.query, sum(qc.n_pages), sum((
+            SELECT count(*) FROM details AS d
+            WHERE d.original_query_id = qc.original_query_id AND d.crawl_time_id = qc.crawl_time_id
+        ))
+        FROM query_crawl AS qc
+        JOIN original_query AS o ON qc.original_query_id = o.id
+        JOIN crawl_time AS t ON qc.crawl_time_id = t.id
+        WHERE t.time >= datetime(?)
+        GROUP BY qc.original_query_id
+        """
+        self.cursor.execute(q,(since.strftime('%Y-%m-%d %H:00:00'),))
+        return {query: n_jobs/n_pages for query,n_pages,n_jobs in self.cursor.fetchall() if n_pages > 0}
+
+    def due_refreshes(self, schedule: list[tuple[float, float]], now: datetime, limit: int) -> list[int]:
+        """
+        A job is due once the interval of its age has passed since its last refresh (or its
+        crawl). The jobs older than the last age of the schedule or expired are never due
+        """
+        self.flush()
+        if len(schedule) == 0 or limit <= 0:
+            return []
+        schedule = sorted(schedule)
+        # The refresh interval of the age of the job
+        interval = "CASE " + " ".join(f"WHEN age < :age{n} THEN :interval{n}" for n in range(len(schedule))) + " END"
+        q = f"""
+        SELECT job_id FROM (
+            SELECT d.job_id,
+            (julianday(:now) - julianday(d.post_time)) * 24 AS age,
+            coalesce((SELECT max(h.time) FROM details_history AS h WHERE h.job_id = d.job_id), t.time) AS last_time
+            FROM details AS d
+            JOIN crawl_time AS t ON d.crawl_time_id = t.id
+            WHERE d.post_time >= datetime(:now, :max_age)
+            AND NOT EXISTS (SELECT 1 FROM details_history AS h WHERE h.job_id = d.job_id AND h.is_expired)
+        )
+        WHERE (julianday(:now) - julianday(last_time)) * 24 >= {interval}
+        ORDER BY last_time LIMIT :limit
+        """
+        params = {"now": now.strftime('%Y-%m-%d %H:%M:%S'), "max_age": f"-{schedule[-1][0]} hours", "limit": limit}
+        for n, (age, hours) in enumerate(schedule):
+            params[f"age{n}"] = age
+            params[f"interval{n}"] = hours
+        self.cursor.execute(q,params)
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def add_history(self, snapshots: list[dict]):
+        with self.transaction():
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO details_history (job_id, time, n_applicants, is_expired) VALUES (?, datetime(?), ?, ?)",
+                [(int(s["job_id"]),s["time"],s["n_applicants"],bool(s["is_expired"])) for s in snapshots]
+            )
+
+    def load_job_ids(self) -> IdIndex:
+        self.cursor.execute("SELECT job_id FROM details ORDER BY job_id")
+        return IdIndex(row[0] for row in self.cursor)
+
+    def exists(self, job_id: int):
+        return int(job_id) in self.job_ids
+
+    def exists_many(self, job_ids: Iterable[int]) -> set[int]:
+        return {int(job_id) for job_id in job_ids if int(job_id) in self.job_ids}
+
+    def pending_apply_links(self, limit: int = 100, after_job_id: int = 0) -> list[int]:
+        self.flush()
+        # The marker is inlined so that the partial index can be used
+        q = f"""
+        SELECT job_id FROM details
+        WHERE apply_link = '{APPLY_LINK_PENDING}' AND job_id > ?
+        ORDER BY job_id LIMIT ?
+        """
+        self.cursor.execute(q,(after_job_id,limit))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    @metrics.timed("db.update_apply_links")
+    def update_apply_links(self, links: dict[int, str | None]):
+        self.flush()
+        with self.transaction():
+            self.conn.executemany(
+                "UPDATE details SET apply_link = ? WHERE job_id = ?",
+                [(apply_link,int(job_id)) for job_id,apply_link in links.items()]
+            )
\ No newline at end of file
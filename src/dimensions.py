@@ -0,0 +1,68 @@
+import sqlite3
+
+
+class Dimension():
+    """
+    Interns the values of a dimension table (e.g. company names) to their ids.
+    The whole table is loaded in a dict once, so a known value costs one dict lookup. A new
+    value is inserted without committing, so it's part of the caller's transaction, and it's
+    kept apart until 'commit'. If the transaction rolls back, 'rollback' forgets it.
+    There's no eviction, the memory grows with the number of distinct values only.
+    table, column: The dimension table and its value column
+    placeholder: SQL expression of the value in the inserts (e.g. "datetime(?)")
+    """
+    def __init__(self, conn:sqlite3.Connection, table:str, column:str, placeholder:str="?") -> None:
+        self.conn = conn
+        self.table = table
+        self.column = column
+        self.placeholder = placeholder
+        self._ids: dict = {}
+        self._uncommitted: dict = {}
+        self.load()
+
+    def load(self):
+        self._ids = {value: id for id, value in self.conn.execute(f"SELECT id, {self.column} FROM {self.table}")}
+        self._uncommitted = {}
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._uncommitted)
+
+    def get_id(self, value) -> int:
+        id = self._ids.get(value)
+        if id is None:
+            id = self._uncommitted.get(value)
+        if id is None:
+            id = self._insert(value)
+            self._uncommitted[value] = id
+        return id
+
+    def _select(self, value) -> int|None:
+        # Another process may have inserted the value since the table was loaded
+        row = self.conn.execute(
+            f"SELECT id FROM {self.table} WHERE {self.column} = {self.placeholder}",(value,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _insert(self, value) -> int:
+        id = self._select(value)
+        if id is not None:
+            return id
+        try:
+            cursor = self.conn.execute(
+                f"INSERT INTO {self.table} ({self.column}) VALUES ({self.placeholder})",(value,)
+            )
+        except sqlite3.IntegrityError:
+            # Inserted by another process in the meantime (unique column)
+            id = self._select(value)
+            if id is None:
+                raise
+            return id
+        assert cursor.lastrowid is not None
+        return cursor.lastrowid
+
+    def commit(self):
+        self._ids.update(self._uncommitted)
+        self._uncommitted = {}
+
+    def rollback(self):
+        self._uncommitted = {}
@@ -0,0 +1,82 @@
+import sqlite3
+from typing import Iterator, List
+
+
+class LinkFrontier():
+    """
+    Persistent queue of the job links crawled from the search pages.
+    Links are deduplicated by job id on insert, so the several <a> tags of a job card
+    are stored once. Each link is marked as done after it's processed, so a resumed
+    run only reads the links that are left.
+    Both inserts and done marks are buffered and written in batches.
+    """
+    def __init__(self, path:str, batch_size:int=100) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+        CREATE TABLE IF NOT EXISTS link (
+            seq INTEGER PRIMARY KEY,
+            job_id INTEGER NOT NULL UNIQUE,
+            href TEXT NOT NULL,
+            page INTEGER,
+            done INTEGER NOT NULL DEFAULT 0
+        );
+        """)
+        self.conn.commit()
+        self._new_links: List[tuple] = []
+        self._done: List[tuple] = []
+
+    def add(self, job_id:int, href:str, page:int|None=None):
+        self._new_links.append((int(job_id),href,page))
+        if len(self._new_links) >= self.batch_size:
+            self.flush_links()
+
+    def mark_done(self, job_id:int):
+        """
+        The mark is persisted on the next 'flush'. Flush the job data first, otherwise a
+        crash may lose a job that is already marked as done.
+        """
+        self._done.append((int(job_id),))
+
+    def should_flush(self) -> bool:
+        return len(self._done) >= self.batch_size
+
+    def flush_links(self):
+        if len(self._new_links) > 0:
+            with self.conn:
+                self.conn.executemany("INSERT OR IGNORE INTO link (job_id, href, page) VALUES (?, ?, ?)",self._new_links)
+            self._new_links = []
+
+    def flush(self):
+        self.flush_links()
+        if len(self._done) > 0:
+            with self.conn:
+                self.conn.executemany("UPDATE link SET done = 1 WHERE job_id = ?",self._done)
+            self._done = []
+
+    def pending(self, chunk_size:int=100) -> Iterator[List[tuple[int,str]]]:
+        """
+        Lazily yields the (job_id, href) of the links that are not done, in chunks and
+        in the order they were crawled.
+        """
+        self.flush_links()
+        last_seq = 0
+        while True:
+            rows = self.conn.execute(
+                "SELECT seq, job_id, href FROM link WHERE done = 0 AND seq > ? ORDER BY seq LIMIT ?",
+                (last_seq,chunk_size)
+            ).fetchall()
+            if len(rows) == 0:
+                return
+            last_seq = rows[-1][0]
+            yield [(job_id,href) for _,job_id,href in rows]
+
+    def count(self, done:bool|None=None) -> int:
+        if done is None:
+            return self.conn.execute("SELECT count(*) FROM link").fetchone()[0]
+        return self.conn.execute("SELECT count(*) FROM link WHERE done = ?",(int(done),)).fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,227 @@
+"""
+Keeps the scrapper's resource usage in check without killing the crawl.
+The governor runs in the monitor process and samples CPU and memory of the scrapper's
+own process tree only (the scrapper process, chromedriver and Chrome). It feeds a
+Throttle, shared with the scrapper process, that slows down the page fetch rate or
+pauses it. The scrapper is restarted only as a last resort and only after it has
+checkpointed its state.
+"""
+import multiprocessing
+from logging import Logger
+from time import monotonic, sleep
+from typing import Literal
+import psutil
+
+GovernorAction = Literal["ok","throttle","pause","restart"]
+
+
+class Throttle():
+	"""
+	Shared between the monitor and the scrapper processes. The scrapper calls 'wait' before
+	loading each page and 'serve_checkpoint' at its safe points.
+	Each scrapper process that serves the checkpoints is registered, so a checkpoint request
+	waits for all of them (see SCHEDULER_WORKERS), not only for the first one.
+	"""
+	def __init__(self) -> None:
+		self._delay = multiprocessing.Value("d",0.0)
+		self._running = multiprocessing.Event()
+		self._running.set()
+		# Number of checkpoint requests so far, and of the registered processes that
+		# served the last one
+		self._checkpoint_generation = multiprocessing.Value("i",0)
+		self._checkpoint_acks = multiprocessing.Value("i",0)
+		self._workers = multiprocessing.Value("i",0)
+		# The last request served by this process
+		self._served_generation = 0
+
+	@property
+	def delay(self) -> float:
+		return self._delay.value
+
+	@delay.setter
+	def delay(self, value:float):
+		self._delay.value = value
+
+	def pause(self):
+		self._running.clear()
+
+	def resume(self):
+		self._running.set()
+
+	@property
+	def paused(self) -> bool:
+		return not self._running.is_set()
+
+	def wait(self):
+		"""
+		Blocks while paused, then sleeps for the current delay
+		"""
+		self._running.wait()
+		if self._delay.value > 0:
+			sleep(self._delay.value)
+
+	def register(self):
+		"""
+		Called by each scrapper process before it starts serving the checkpoints
+		"""
+		self._served_generation = self._checkpoint_generation.value
+		with self._workers.get_lock():
+			self._workers.value += 1
+
+	def unregister(self):
+		with self._workers.get_lock():
+			self._workers.value = max(0,self._workers.value - 1)
+
+	def reset_workers(self):
+		"""
+		Forgets the registered processes, e.g. after they're killed
+		"""
+		with self._workers.get_lock():
+			self._workers.value = 0
+
+	def request_checkpoint(self, timeout:float, poll_interval:float=0.1) -> bool:
+		"""
+		Asks the scrapper processes to checkpoint and waits for all the registered ones
+		(at least one). Returns False on timeout
+		"""
+		with self._checkpoint_generation.get_lock():
+			self._checkpoint_acks.value = 0
+			self._checkpoint_generation.value += 1
+		deadline = monotonic() + timeout
+		while self._checkpoint_acks.value < max(1,self._workers.value):
+			if monotonic() >= deadline:
+				return False
+			sleep(poll_interval)
+		return True
+
+	def serve_checkpoint(self, checkpoint) -> bool:
+		"""
+		Calls 'checkpoint' if the monitor asked for it since the last call in this process.
+		Must be called at a safe point
+		"""
+		generation = self._checkpoint_generation.value
+		if generation == self._served_generation:
+			return False
+		checkpoint()
+		self._served_generation = generation
+		with self._checkpoint_acks.get_lock():
+			self._checkpoint_acks.value += 1
+		return True
+
+
+class ResourceGovernor():
+	"""
+	Each 'step' samples the process tree and adjusts the throttle:
+	- Over the limits: the delay between page loads grows by 'delay_step' up to 'max_delay'.
+		Once it's at 'max_delay' and still overloaded, the scrapper is paused for 'pause_time'.
+	- Under 'cpu_low': the delay is halved.
+	- Overloaded for more than 'max_overload_count' steps in a row: restart.
+	cpu_high and cpu_low are percentages of the whole machine (0-100).
+	rss_limit_mb <= 0 disables the memory limit.
+	"""
+	def __init__(
+			self,
+			throttle:Throttle,
+			logger:Logger,
+			cpu_high:float=80,
+			cpu_low:float=50,
+			rss_limit_mb:float=0,
+			delay_step:float=0.5,
+			max_delay:float=5,
+			pause_time:float=20,
+			max_overload_count:int=30
+			) -> None:
+		self.throttle = throttle
+		self.logger = logger
+		self.cpu_high = cpu_high
+		self.cpu_low = cpu_low
+		self.rss_limit = rss_limit_mb * 2**20
+		self.delay_step = delay_step
+		self.max_delay = max_delay
+		self.pause_time = pause_time
+		self.max_overload_count = max_overload_count
+		self.overload_count = 0
+		self._paused_until: float|None = None
+		self._processes: dict[int,psutil.Process] = {}
+
+	def tree(self, pid:int) -> list[psutil.Process]:
+		"""
+		The process and all its descendants. The Process objects are kept between the steps
+		since cpu_percent is measured from the previous call on the same object
+		"""
+		try:
+			root = self._processes.get(pid) or psutil.Process(pid)
+			children = root.children(recursive=True)
+		except psutil.NoSuchProcess:
+			return []
+		processes = {pid: root}
+		for child in children:
+			processes[child.pid] = self._processes.get(child.pid,child)
+		self._processes = processes
+		return list(processes.values())
+
+	def sample(self, pid:int) -> tuple[float,int]:
+		"""
+		Returns (cpu percent of the whole machine, total rss in bytes) of the process tree
+		"""
+		cpu = 0.0
+		rss = 0
+		for process in self.tree(pid):
+			try:
+				cpu += process.cpu_percent(None)
+				rss += process.memory_info().rss
+			except psutil.Error:
+				continue
+		return cpu / (psutil.cpu_count() or 1), rss
+
+	def step(self, pid:int) -> GovernorAction:
+		cpu, rss = self.sample(pid)
+		overloaded = cpu > self.cpu_high or (self.rss_limit > 0 and rss > self.rss_limit)
+		if self._paused_until is not None:
+			if monotonic() < self._paused_until:
+				return "pause"
+			self.logger.info("Resuming the scrapper")
+			self._paused_until = None
+			self.throttle.resume()
+		if not overloaded:
+			self.overload_count = 0
+			if cpu < self.cpu_low and self.throttle.delay > 0:
+				self.throttle.delay = self.throttle.delay / 2 if self.throttle.delay > 0.1 else 0
+				self.logger.debug(f"Load is low (cpu={cpu:.0f}%). Page delay={self.throttle.delay:.2f}s")
+			return "ok"
+		self.overload_count += 1
+		self.logger.warning(f"High resource usage (cpu={cpu:.0f}%, rss={rss/2**20:.0f}MB). Count={self.overload_count}")
+		if self.overload_count > self.max_overload_count:
+			return "restart"
+		if self.throttle.delay < self.max_delay:
+			self.throttle.delay = min(self.max_delay,self.throttle.delay + self.delay_step)
+			self.logger.info(f"Throttling the scrapper. Page delay={self.throttle.delay:.2f}s")
+			return "throttle"
+		self.logger.info(f"Pausing the scrapper for {self.pause_time}s")
+		self.throttle.pause()
+		self._paused_until = monotonic() + self.pause_time
+		return "pause"
+
+	def restart(self, process:multiprocessing.Process, checkpoint_timeout:float=60):
+		"""
+		Asks the scrapper to checkpoint, then kills its process tree
+		"""
+		# The scrapper can't reach a safe point while it's paused
+		self.throttle.resume()
+		self._paused_until = None
+		if self.throttle.request_checkpoint(checkpoint_timeout):
+			self.logger.info("The scrapper is checkpointed")
+		else:
+			self.logger.warning("Some scrapper processes did not checkpoint in time")
+		if process.pid is not None:
+			for child in self.tree(process.pid)[1:]:
+				try:
+					child.kill()
+				except psutil.Error:
+					continue
+		process.kill()
+		process.join()
+		# The killed processes can't unregister
+		self.throttle.reset_workers()
+		self.overload_count = 0
+		self.throttle.delay = 0
@@ -0,0 +1,81 @@
+"""
+Fetches pages over plain HTTP with the cookies of the signed-in webdriver session.
+Most of the fields of a job page are in its HTML, so there's no need to render it in
+Chrome. The requests share a pool of keep-alive connections and run on a thread pool,
+so several pages are downloaded while the previous ones are being parsed.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import Logger
+import requests
+from requests.adapters import HTTPAdapter
+from .vault import driver_cookies
+
+
+class HttpFetcher():
+	"""
+	pool_size: Number of concurrent requests and of kept-alive connections per host
+	"""
+	def __init__(
+			self,
+			logger:Logger,
+			cookies:list[dict]|None=None,
+			user_agent:str|None=None,
+			pool_size:int=8,
+			timeout:float=15
+			) -> None:
+		self.logger = logger
+		self.timeout = timeout
+		self.session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=pool_size,pool_maxsize=pool_size)
+		self.session.mount("http://",adapter)
+		self.session.mount("https://",adapter)
+		if user_agent is not None:
+			self.session.headers["User-Agent"] = user_agent
+		self.set_cookies(cookies or [])
+		self.executor = ThreadPoolExecutor(max_workers=pool_size,thread_name_prefix="http-fetch")
+
+	@classmethod
+	def from_driver(cls, driver, logger:Logger, **kwargs) -> "HttpFetcher":
+		"""
+		Uses the cookies and the user agent of a (signed-in) webdriver session
+		"""
+		return cls(
+			logger,
+			cookies=driver_cookies(driver),
+			user_agent=driver.execute_script("return navigator.userAgent"),
+			**kwargs
+		)
+
+	def set_cookies(self, cookies:list[dict]):
+		self.session.cookies.clear()
+		for cookie in cookies:
+			self.session.cookies.set(
+				cookie["name"],
+				cookie["value"],
+				domain=cookie.get("domain",""),
+				path=cookie.get("path","/")
+			)
+
+	def fetch(self, url:str) -> str|None:
+		"""
+		Returns the HTML of the page or None if it can't be fetched
+		"""
+		try:
+			response = self.session.get(url,timeout=self.timeout)
+		except requests.RequestException as e:
+			self.logger.warning(f"Error fetching {url}: {e}")
+			return None
+		if response.status_code != 200:
+			self.logger.warning(f"Error fetching {url}: HTTP {response.status_code}")
+			return None
+		return response.text
+
+	def submit(self, url:str) -> Future:
+		"""
+		Starts fetching the page in the background. The future's result is the same as 'fetch'
+		"""
+		return self.executor.submit(self.fetch,url)
+
+	def close(self):
+		self.executor.shutdown(wait=True,cancel_futures=True)
+		self.session.close()
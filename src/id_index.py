@@ -0,0 +1,49 @@
+from array import array
+from bisect import bisect_left
+from typing import Iterable
+
+
+class IdIndex():
+    """
+    A compact set of integer ids (e.g. LinkedIn job ids).
+    The bulk of the ids live in a sorted array('q') (8 bytes per id) and are looked up
+    with binary search. Newly added ids go to a small set that is merged into the array
+    once it grows larger than 'merge_size'.
+    """
+    def __init__(self, ids:Iterable[int]=(), merge_size:int=4096) -> None:
+        self._sorted = array('q', sorted(set(int(i) for i in ids)))
+        self._recent: set[int] = set()
+        self.merge_size = merge_size
+
+    def __contains__(self, id) -> bool:
+        id = int(id)
+        if id in self._recent:
+            return True
+        i = bisect_left(self._sorted, id)
+        return i < len(self._sorted) and self._sorted[i] == id
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._recent)
+
+    def add(self, id:int):
+        if id in self:
+            return
+        self._recent.add(int(id))
+        if len(self._recent) >= self.merge_size:
+            self._merge()
+
+    def update(self, ids:Iterable[int]):
+        for id in ids:
+            self.add(id)
+
+    def discard(self, id:int):
+        id = int(id)
+        self._recent.discard(id)
+        i = bisect_left(self._sorted, id)
+        if i < len(self._sorted) and self._sorted[i] == id:
+            del self._sorted[i]
+
+    def _merge(self):
+        merged = sorted(self._recent.union(self._sorted))
+        self._sorted = array('q', merged)
+        self._recent = set()
@@ -0,0 +1,74 @@
+"""
+Settings of the "lean" browser mode. We only read text and a few attributes of the pages,
+so images, fonts, media and tracking scripts are blocked and Chrome runs with flags that
+cut its background work. This is what keeps Chrome usable on a micro instance.
+"""
+from selenium.webdriver.chrome.options import Options
+
+# URL patterns blocked through CDP 'Network.setBlockedURLs', by resource type
+BLOCKED_URL_PATTERNS: dict[str,list[str]] = {
+	"image": ["*.png","*.jpg","*.jpeg","*.gif","*.webp","*.avif","*.svg","*.ico","*.bmp"],
+	"font": ["*.woff","*.woff2","*.ttf","*.otf","*.eot"],
+	"media": ["*.mp4","*.webm","*.ogg","*.mp3","*.wav","*.m3u8"],
+	"stylesheet": ["*.css"],
+	"tracking": [
+		"*doubleclick.net*","*google-analytics.com*","*googletagmanager.com*","*px.ads.linkedin.com*",
+		"*/li/track*","*linkedin.com/tscp-serving/*","*linkedin.com/realtime/*"
+	]
+}
+# Stylesheets are not blocked by default since some elements we click may not be
+# clickable without them
+DEFAULT_BLOCKED_TYPES = ["image","font","media","tracking"]
+
+# Chrome content settings (2 = block). There's none for audio and video downloads (the
+# media_stream setting is the camera and microphone permission), so the media is only
+# blocked by the URL patterns
+CONTENT_SETTINGS_PREFS: dict[str,dict] = {
+	"image": {"profile.managed_default_content_settings.images": 2},
+	"stylesheet": {"profile.managed_default_content_settings.stylesheets": 2},
+}
+COMMON_PREFS = {
+	"profile.default_content_setting_values.notifications": 2,
+	"profile.default_content_setting_values.geolocation": 2,
+	"profile.managed_default_content_settings.plugins": 2,
+	"profile.managed_default_content_settings.popups": 1
+}
+
+LOW_OVERHEAD_ARGUMENTS = [
+	"--disable-gpu",
+	"--disable-dev-shm-usage",
+	"--no-first-run",
+	"--no-default-browser-check",
+	"--disable-background-networking",
+	"--disable-component-update",
+	"--disable-default-apps",
+	"--disable-sync",
+	"--disable-client-side-phishing-detection",
+	"--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+	"--metrics-recording-only",
+	"--mute-audio"
+]
+
+
+def apply_lean_options(options:Options, blocked_types:list[str]|None=None):
+	"""
+	Adds the prefs and flags of the lean mode to the options of a new Chrome session
+	"""
+	blocked_types = DEFAULT_BLOCKED_TYPES if blocked_types is None else blocked_types
+	prefs = dict(COMMON_PREFS)
+	for resource_type in blocked_types:
+		prefs.update(CONTENT_SETTINGS_PREFS.get(resource_type,{}))
+	options.add_experimental_option("prefs",prefs)
+	for argument in LOW_OVERHEAD_ARGUMENTS:
+		options.add_argument(argument)
+	if "image" in blocked_types:
+		options.add_argument("--blink-settings=imagesEnabled=false")
+
+def block_resources(driver, blocked_types:list[str]|None=None):
+	"""
+	Blocks the URL patterns of the resource types in a running Chrome session
+	"""
+	blocked_types = DEFAULT_BLOCKED_TYPES if blocked_types is None else blocked_types
+	urls = [pattern for resource_type in blocked_types for pattern in BLOCKED_URL_PATTERNS.get(resource_type,[])]
+	driver.execute_cdp_cmd("Network.enable",{})
+	driver.execute_cdp_cmd("Network.setBlockedURLs",{"urls":urls})
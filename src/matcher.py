@@ -1,7 +1,9 @@
-from thefuzz import fuzz, process
+from collections import OrderedDict
+from rapidfuzz import fuzz as rfuzz, process as rprocess
 from typing import Literal, List
 
 def fuzz_match(ls1:List[str],ls2:List[str], method:Literal["Qratio","Wratio","normal","partial"] = "partial"):
+    from thefuzz import fuzz
     if len(ls1) == 0 or len(ls2) == 0:
         return None
     elif method == "partial":
@@ -14,6 +16,7 @@ def fuzz_match(ls1:List[str],ls2:List[str], method:Literal["Qratio","Wratio","no
         return fuzz.token_sort_ratio(ls1,ls2)
 
 def find_matches(ls1, ls2, threshold=80):
+    from thefuzz import process
     matches = []
     for keyword in ls1:
         # Find the best match in list2 for each keyword in list1
@@ -22,4 +25,59 @@ def find_matches(ls1, ls2, threshold=80):
             matches.append(keyword)
     if len(matches) == 0:
         return None
-    return matches
\ No newline at end of file
+    return matches
+
+class SkillMatcher():
+    """
+    Matches job skills against a fixed list of skills (MY_SKILLS).
+    Gives the same results as 'fuzz_match' (partial method) and 'find_matches', but the
+    fixed skills are normalized once, the new job skills of a job are scored against all
+    of them in one vectorized 'cdist' call, and the best score of each job skill is kept
+    in a bounded LRU cache since the same skills repeat across the job postings.
+    """
+    def __init__(self, my_skills:List[str], cache_size:int=10000):
+        self.my_skills = my_skills
+        self.cache_size = cache_size
+        from thefuzz.utils import full_process
+        # The same processing thefuzz applies in 'extractOne' with its default scorer
+        self._choices = [full_process(skill, force_ascii=True) for skill in my_skills]
+        # The same processing thefuzz applies in 'partial_token_sort_ratio' on the whole list
+        self._sorted_tokens = _sorted_tokens(my_skills)
+        self._best_scores: OrderedDict[str,int] = OrderedDict()
+
+    def best_scores(self, skills:List[str]) -> List[int]:
+        """
+        The score of the best match of each skill among 'my_skills'
+        """
+        new_skills = list({skill for skill in skills if skill not in self._best_scores})
+        if len(new_skills) > 0:
+            from thefuzz.utils import full_process
+            queries = [full_process(full_process(skill), force_ascii=True) for skill in new_skills]
+            matrix = rprocess.cdist(queries, self._choices, scorer=rfuzz.WRatio, processor=None)
+            for skill, row in zip(new_skills, matrix.max(axis=1)):
+                self._best_scores[skill] = int(round(float(row)))
+        res = []
+        for skill in skills:
+            self._best_scores.move_to_end(skill)
+            res.append(self._best_scores[skill])
+        while len(self._best_scores) > self.cache_size:
+            self._best_scores.popitem(last=False)
+        return res
+
+    def find_matches(self, skills:List[str], threshold:int=80):
+        if len(skills) == 0 or len(self.my_skills) == 0:
+            return None
+        matches = [skill for skill, score in zip(skills, self.best_scores(skills)) if score >= threshold]
+        if len(matches) == 0:
+            return None
+        return matches
+
+    def fuzz_match(self, skills:List[str]):
+        if len(skills) == 0 or len(self.my_skills) == 0:
+            return None
+        return int(round(rfuzz.partial_ratio(_sorted_tokens(skills), self._sorted_tokens)))
+
+
+def _sorted_tokens(ls:List[str]) -> str:
+    from thefuzz.utils import full_process
+    return " ".join(sorted(full_process(str(ls), force_ascii=True).split()))
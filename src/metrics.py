@@ -0,0 +1,116 @@
+"""
+Hot-path instrumentation. Counters and timings go to a metrics backend:
+- NullMetrics: does nothing (the default)
+- MemoryMetrics: keeps everything in memory, for tests and benchmarks
+- StatsDMetrics: sends the metrics over UDP to a StatsD server (e.g. the CloudWatch agent)
+The backend is global and set once with 'set_metrics'. The helpers look it up on every
+call, so the instrumented code doesn't need a reference to it.
+"""
+import socket
+from contextlib import contextmanager
+from functools import wraps
+from logging import getLogger
+from time import perf_counter
+
+
+class NullMetrics():
+	def incr(self, name:str, value:int=1):
+		pass
+
+	def timing(self, name:str, ms:float):
+		pass
+
+	def gauge(self, name:str, value:float):
+		pass
+
+	@contextmanager
+	def timer(self, name:str):
+		start = perf_counter()
+		try:
+			yield
+		finally:
+			self.timing(name,(perf_counter()-start)*1000)
+
+
+class MemoryMetrics(NullMetrics):
+	def __init__(self) -> None:
+		self.counters: dict[str,int] = {}
+		self.timings: dict[str,list[float]] = {}
+		self.gauges: dict[str,float] = {}
+
+	def incr(self, name:str, value:int=1):
+		self.counters[name] = self.counters.get(name,0) + value
+
+	def timing(self, name:str, ms:float):
+		self.timings.setdefault(name,[]).append(ms)
+
+	def gauge(self, name:str, value:float):
+		self.gauges[name] = value
+
+
+class StatsDMetrics(NullMetrics):
+	"""
+	Fire-and-forget StatsD client. The socket is non-blocking and a metric that can't be
+	sent right away is dropped, so the scrapper never waits for the metrics.
+	"""
+	def __init__(self, host:str="127.0.0.1", port:int=8125, prefix:str="scrapper") -> None:
+		self.address = (host,port)
+		self.prefix = prefix + "." if prefix else ""
+		self.sock = socket.socket(socket.AF_INET,socket.SOCK_DGRAM)
+		self.sock.setblocking(False)
+		self.n_dropped = 0
+
+	def send(self, name:str, value, kind:str):
+		try:
+			self.sock.sendto(f"{self.prefix}{name}:{value}|{kind}".encode(),self.address)
+		except OSError:
+			self.n_dropped += 1
+
+	def incr(self, name:str, value:int=1):
+		self.send(name,value,"c")
+
+	def timing(self, name:str, ms:float):
+		self.send(name,f"{ms:.3f}","ms")
+
+	def gauge(self, name:str, value:float):
+		self.send(name,value,"g")
+
+
+_metrics: NullMetrics = NullMetrics()
+
+def set_metrics(metrics:NullMetrics):
+	global _metrics
+	_metrics = metrics
+
+def get_metrics() -> NullMetrics:
+	return _metrics
+
+def metrics_from_env(host:str|None, port:int=8125, prefix:str="scrapper") -> NullMetrics:
+	"""
+	Returns a StatsD backend if 'host' is set, otherwise the no-op backend
+	"""
+	if not host:
+		return NullMetrics()
+	getLogger().debug(f"Sending metrics to StatsD at {host}:{port}")
+	return StatsDMetrics(host,port,prefix)
+
+def incr(name:str, value:int=1):
+	_metrics.incr(name,value)
+
+def timer(name:str):
+	"""
+	Context manager that records the time spent in its block
+	"""
+	return _metrics.timer(name)
+
+def timed(name:str):
+	"""
+	Decorator that records the time spent in each call of the function
+	"""
+	def decorator(func):
+		@wraps(func)
+		def wrapper(*args, **kwargs):
+			with _metrics.timer(name):
+				return func(*args,**kwargs)
+		return wrapper
+	return decorator
@@ -0,0 +1,146 @@
+"""
+Extracts data from LinkedIn pages out of the page source.
+Reading the whole page once with 'driver.page_source' and parsing it locally is much
+faster than calling 'find_element' and '.text' on each element, since every webdriver
+call is a separate HTTP round trip to chromedriver.
+"""
+import re
+from datetime import date
+from urllib.parse import urljoin
+from lxml import html
+
+NO_MATCH_XPATH = "//h1[text()[contains(.,'No matching jobs found.')]]"
+JOB_CARD_LINKS_XPATH = "//div[contains(@class, 'job-card-container')]//a/@href"
+JOB_CARD_DATES_XPATH = "//div[contains(@class, 'job-card-container')]//time/@datetime"
+ALERT_XPATH = "//div[contains(@role,'alert')]"
+TITLE_XPATH = "//h1"
+DETAILS_XPATH = "//div[contains(@class,'job-details-jobs-unified-top-card__primary-description-container')]"
+SKILLS_LIST_XPATH = "//ul[contains(@class,'job-details-skill-match-status-list')]"
+APPLY_BUTTON_XPATH = "//button[contains(@class,'jobs-apply-button')]"
+SKILLS_BUTTON_XPATH = "//span[text()[contains(.,'Show all skills') or contains(.,'Show qualification details')]]"
+# The server-rendered (public) job page, which an HTTP fetch may get instead of the page the
+# browser renders
+PUBLIC_TITLE_XPATH = "//h1[contains(@class,'top-card-layout__title')]"
+PUBLIC_FLAVOR_ROWS_XPATH = "//div[contains(@class,'topcard__flavor-row')]"
+PUBLIC_COMPANY_XPATH = ".//*[contains(@class,'topcard__org-name-link')]"
+PUBLIC_LOCATION_XPATH = ".//span[contains(@class,'topcard__flavor--bullet')]"
+PUBLIC_POST_TIME_XPATH = "//*[contains(@class,'posted-time-ago__text')]"
+PUBLIC_APPLICANTS_XPATH = "//*[contains(@class,'num-applicants__caption')]"
+PUBLIC_CLOSED_XPATH = "//*[contains(@class,'closed-job')]"
+PUBLIC_APPLY_BUTTON_XPATH = "//button[contains(@class,'apply-button--link')]"
+
+whitespace_pattern = re.compile(r"\s+")
+number_pattern = re.compile(r"\d[\d,]*")
+
+
+def parse_html(page_source:str) -> html.HtmlElement:
+	return html.fromstring(page_source)
+
+def element_text(element:html.HtmlElement) -> str:
+	"""
+	Text content of the element with the whitespace collapsed, close to what a browser renders
+	"""
+	return whitespace_pattern.sub(" ",element.text_content()).strip()
+
+def has_no_match(tree:html.HtmlElement) -> bool:
+	return len(tree.xpath(NO_MATCH_XPATH)) > 0
+
+def parse_job_card_links(tree:html.HtmlElement, base_url:str) -> list[str]:
+	"""
+	Returns the absolute links of all the <a> tags in the job cards of a search result page
+	without the query string. A job card usually has more than one link to the same job.
+	"""
+	return [urljoin(base_url,href).split("?")[0] for href in tree.xpath(JOB_CARD_LINKS_XPATH)]
+
+def parse_job_card_dates(tree:html.HtmlElement) -> list[date]:
+	"""
+	Returns the post dates of the job cards of a search result page that show one
+	"""
+	res = []
+	for value in tree.xpath(JOB_CARD_DATES_XPATH):
+		try:
+			res.append(date.fromisoformat(value.strip()[:10]))
+		except ValueError:
+			continue
+	return res
+
+def parse_job_top_card(tree:html.HtmlElement) -> dict:
+	"""
+	Extracts the fields shown at the top of a job page.
+	The primary description is rendered as "company · location · post time · applicants"
+	and the number of applicants may be missing.
+	"""
+	if is_public_page(tree):
+		return parse_public_top_card(tree)
+	title = element_text(tree.xpath(TITLE_XPATH)[0])
+	details_el = tree.xpath(DETAILS_XPATH)[0]
+	detail_items = [item.strip() for item in element_text(details_el).split("·")]
+	if len(detail_items) == 3:
+		detail_items.append("0 applicants")
+	[company_name,location,post_time_raw,n_applicants] = detail_items[:4]
+	return {
+		"title": title,
+		"company_name": company_name,
+		"location": location,
+		"post_time_raw": post_time_raw,
+		"n_applicants_raw": n_applicants,
+		"is_expired": len(tree.xpath(ALERT_XPATH)) > 0
+	}
+
+def is_public_page(tree:html.HtmlElement) -> bool:
+	"""
+	Whether it's the server-rendered job page. It doesn't show the skills
+	"""
+	return len(tree.xpath(DETAILS_XPATH)) == 0 and len(tree.xpath(PUBLIC_TITLE_XPATH)) > 0
+
+def parse_public_top_card(tree:html.HtmlElement) -> dict:
+	"""
+	The fields of 'parse_job_top_card' from the server-rendered job page. The company and the
+	location are on the first flavor row, the post time and the applicants on the second
+	"""
+	first_row = tree.xpath(PUBLIC_FLAVOR_ROWS_XPATH)[0]
+	applicants = tree.xpath(PUBLIC_APPLICANTS_XPATH)
+	return {
+		"title": element_text(tree.xpath(PUBLIC_TITLE_XPATH)[0]),
+		"company_name": element_text(first_row.xpath(PUBLIC_COMPANY_XPATH)[0]),
+		"location": element_text(first_row.xpath(PUBLIC_LOCATION_XPATH)[0]),
+		"post_time_raw": element_text(tree.xpath(PUBLIC_POST_TIME_XPATH)[0]),
+		"n_applicants_raw": element_text(applicants[0]) if len(applicants) > 0 else "0 applicants",
+		"is_expired": len(tree.xpath(PUBLIC_CLOSED_XPATH)) > 0
+	}
+
+def parse_count(text:str) -> int:
+	"""
+	The first number in a text like "Over 200 applicants". 0 if there's none
+	"""
+	match = number_pattern.search(text)
+	return 0 if match is None else int(match.group().replace(",",""))
+
+def has_apply_button(tree:html.HtmlElement) -> bool:
+	"""
+	Whether the job is applied on an external site ("Easy Apply" jobs are applied on LinkedIn)
+	"""
+	buttons = tree.xpath(APPLY_BUTTON_XPATH) + tree.xpath(PUBLIC_APPLY_BUTTON_XPATH)
+	return any(element_text(button) == "Apply" for button in buttons)
+
+def has_skills_button(tree:html.HtmlElement) -> bool:
+	"""
+	The skills are only shown in a modal after clicking this button, so they can't be
+	read from a page that is fetched without the browser
+	"""
+	return len(tree.xpath(SKILLS_BUTTON_XPATH)) > 0
+
+def parse_skills(tree:html.HtmlElement) -> list[str]:
+	"""
+	Extracts the skills from the opened skills modal. Each list item starts with the skill
+	name followed by other details, so only its first piece of text is kept.
+	"""
+	table = tree.xpath(SKILLS_LIST_XPATH)
+	if len(table) != 1:
+		return []
+	res = []
+	for skill in table[0].iter("li"):
+		texts = [t.strip() for t in skill.itertext() if t.strip() != ""]
+		if len(texts) > 0:
+			res.append(texts[0])
+	return res
@@ -0,0 +1,140 @@
+from logging import Logger
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Iterable
+
+# Marks the end of the stream in the queues
+_END = object()
+
+
+class ScrapePipeline():
+	"""
+	Runs the scraping of the job links as a chain of stages connected by bounded queues:
+		links (caller's thread) -> scrape (thread) -> match (thread) -> persist (caller's thread)
+	While the results of a page are being matched and written, the scrape stage is already
+	loading the next page. The bounded queues give backpressure: a slow stage makes the
+	previous stages wait instead of piling up results in memory.
+	The caller's thread feeds the links and persists the results, so everything that
+	touches the SQLite connections (link frontier and job data) stays on the thread that
+	created them.
+	The scrape stage can run several scrape functions, each on a thread of its own (e.g. one
+	per webdriver of a ScrapperPool), taking the links from the same queue.
+	If any stage raises, all stages stop and the exception is re-raised to the caller.
+	"""
+	def __init__(
+			self,
+			scrape:Callable[[str],dict|None]|list[Callable[[str],dict|None]],
+			match:Callable[[dict],dict],
+			persist:Callable[[list[dict]],None],
+			logger:Logger,
+			queue_size:int=4,
+			poll_interval:float=0.1,
+			on_idle:Callable[[],Any]|None=None
+			) -> None:
+		"""
+		scrape: A scrape function or a list of them, one per scrape thread
+		on_idle: Called on the caller's thread whenever no result is ready to be persisted
+		"""
+		self.scrapers = scrape if isinstance(scrape,list) else [scrape]
+		self.match = match
+		self.persist = persist
+		self.on_idle = on_idle
+		self.logger = logger
+		self.poll_interval = poll_interval
+		self.links: Queue = Queue(maxsize=queue_size)
+		self.scraped: Queue = Queue(maxsize=queue_size)
+		self.matched: Queue = Queue(maxsize=queue_size)
+		self.stop = Event()
+		self.error: BaseException|None = None
+		# The threads of each stage that haven't reached the end of the stream
+		self._running = {"scrape": len(self.scrapers), "match": 1}
+		self._running_lock = Lock()
+
+	def _put(self, q:Queue, item:Any) -> bool:
+		while not self.stop.is_set():
+			try:
+				q.put(item,timeout=self.poll_interval)
+				return True
+			except Full:
+				continue
+		return False
+
+	def _get(self, q:Queue) -> Any:
+		while not self.stop.is_set():
+			try:
+				return q.get(timeout=self.poll_interval)
+			except Empty:
+				continue
+		return _END
+
+	def _stage(self, name:str, func:Callable, source:Queue, sink:Queue):
+		try:
+			while True:
+				item = self._get(source)
+				if item is _END:
+					break
+				res = func(item)
+				if res is not None and not self._put(sink,res):
+					return
+			with self._running_lock:
+				self._running[name] -= 1
+				last = self._running[name] == 0
+			if last:
+				self._put(sink,_END)
+			else:
+				# Left for the other threads of the stage
+				self._put(source,_END)
+		except BaseException as e:
+			self.logger.error(f"The '{name}' stage of the pipeline stopped with an error: {e}")
+			self.error = e
+			self.stop.set()
+
+	def run(self, links:Iterable[str]):
+		threads = [
+			Thread(target=self._stage,args=("scrape",scrape,self.links,self.scraped),name=f"pipeline-scrape-{i}",daemon=True)
+			for i, scrape in enumerate(self.scrapers)
+		]
+		threads.append(Thread(target=self._stage,args=("match",self.match,self.scraped,self.matched),name="pipeline-match",daemon=True))
+		for thread in threads:
+			thread.start()
+		links_iter = iter(links)
+		pending_link = None
+		links_done = False
+		try:
+			while not self.stop.is_set():
+				# Keep the links queue topped up without blocking the persist stage
+				while not links_done:
+					if pending_link is None:
+						pending_link = next(links_iter,_END)
+					try:
+						self.links.put_nowait(pending_link)
+					except Full:
+						break
+					links_done = pending_link is _END
+					pending_link = None
+				try:
+					item = self.matched.get(timeout=self.poll_interval)
+				except Empty:
+					if self.on_idle is not None:
+						self.on_idle()
+					continue
+				# Write everything that is ready in one batch
+				batch = []
+				while item is not _END:
+					batch.append(item)
+					try:
+						item = self.matched.get_nowait()
+					except Empty:
+						break
+				if len(batch) > 0:
+					self.persist(batch)
+				if item is _END:
+					break
+		except BaseException as e:
+			self.error = self.error or e
+		finally:
+			self.stop.set()
+			for thread in threads:
+				thread.join()
+		if self.error is not None:
+			raise self.error
@@ -0,0 +1,49 @@
+from functools import partial
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+	from .scrapper import Scrapper
+
+
+class ScrapperPool():
+	"""
+	Scrapes a list of job links with several independent webdriver sessions.
+	Worker 0 is the main scrapper itself, the other workers are extra Scrapper instances
+	which are created on the first use and kept alive between queries.
+	The workers are the scrape stage of a ScrapePipeline: each one runs on a thread of its
+	own and takes the links from the same queue, so a slow worker doesn't hold back a fixed
+	share of them. The results go through the match and persist stages of the pipeline, so
+	only the caller's thread touches the database. The pool keeps no progress of its own:
+	the caller marks each link as done in the frontier once its job is persisted, so a
+	crashed run resumes from the pending links of the frontier.
+	"""
+	def __init__(self, main:"Scrapper", size:int) -> None:
+		self.main = main
+		self.size = size
+		self.workers: dict[int,"Scrapper"] = {0: main}
+
+	def get_worker(self, worker_id:int) -> "Scrapper":
+		if worker_id not in self.workers:
+			worker = self.main.spawn_worker(worker_id)
+			worker.sign_in()
+			self.workers[worker_id] = worker
+		return self.workers[worker_id]
+
+	def close(self):
+		"""
+		Quits the webdrivers of all the workers except the main scrapper
+		"""
+		for worker_id, worker in list(self.workers.items()):
+			if worker_id != 0:
+				worker.quit()
+				del self.workers[worker_id]
+
+	def scrape_with(self, worker_id:int, link:str) -> dict|None:
+		return self.get_worker(worker_id).scrape_link(link)
+
+	def scrapers(self) -> list[Callable[[str],dict|None]]:
+		"""
+		One scrape function per worker, for the scrape stage of ScrapePipeline. The worker's
+		webdriver is created (and signed in) on the thread of its first scrape
+		"""
+		return [partial(self.scrape_with,worker_id) for worker_id in range(self.size)]
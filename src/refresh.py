@@ -0,0 +1,97 @@
+"""
+Revisits the stored jobs to track how their number of applicants changes over time.
+A refresh only reads the top card of the job page, downloaded over HTTP with the cookies
+of the signed-in session: no skills modal, no apply click and no rendering. The pages
+that can't be fetched or parsed can be handed to a (slower) browser fallback.
+Young jobs change fast, so they are revisited often. The interval between two visits
+grows with the age of the job (see DEFAULT_SCHEDULE), and the jobs past the last age of
+the schedule, or expired, are not revisited anymore.
+"""
+from datetime import datetime
+from logging import Logger
+from typing import Callable
+from .contracts import JobData
+from .http_fetch import HttpFetcher
+from . import parsers
+from . import metrics
+
+# (maximum age of the job, interval between two refreshes), both in hours
+DEFAULT_SCHEDULE: list[tuple[float,float]] = [(24,2),(72,6),(168,24),(720,72)]
+
+
+class JobRefresher():
+	"""
+	schedule: The refresh schedule in the format of DEFAULT_SCHEDULE, sorted by age
+	fallback: Called with the job id of the pages that can't be read over HTTP. Returns the
+		top card of the job (see parsers.parse_job_top_card) or None. It runs on the
+		caller's thread, one job at a time
+	"""
+	def __init__(
+			self,
+			job_data:JobData,
+			fetcher:HttpFetcher,
+			base_url:str,
+			logger:Logger,
+			schedule:list[tuple[float,float]]|None=None,
+			batch_size:int=50,
+			fallback:Callable[[int],dict|None]|None=None
+			) -> None:
+		self.job_data = job_data
+		self.fetcher = fetcher
+		self.base_url = base_url.rstrip("/")
+		self.logger = logger
+		self.schedule = sorted(schedule or DEFAULT_SCHEDULE)
+		self.batch_size = batch_size
+		self.fallback = fallback
+
+	def job_url(self, job_id:int) -> str:
+		return f"{self.base_url}/jobs/view/{job_id}/"
+
+	def read_top_card(self, job_id:int, page_source:str|None) -> dict|None:
+		if page_source is not None:
+			try:
+				return parsers.parse_job_top_card(parsers.parse_html(page_source))
+			except Exception as e:
+				self.logger.debug(f"Error parsing the refreshed page of job {job_id}: {e}")
+		if self.fallback is None:
+			return None
+		metrics.incr("refresh.fallbacks")
+		try:
+			return self.fallback(job_id)
+		except Exception as e:
+			self.logger.warning(f"Error refreshing job {job_id} in the browser: {e}")
+			return None
+
+	def refresh_batch(self, job_ids:list[int], now:datetime) -> list[dict]:
+		futures = [(job_id,self.fetcher.submit(self.job_url(job_id))) for job_id in job_ids]
+		snapshots = []
+		for job_id, future in futures:
+			top_card = self.read_top_card(job_id,future.result())
+			if top_card is None:
+				metrics.incr("refresh.failed")
+				continue
+			snapshots.append({
+				"job_id": job_id,
+				"time": now,
+				"n_applicants": parsers.parse_count(top_card["n_applicants_raw"]),
+				"is_expired": top_card["is_expired"]
+			})
+		return snapshots
+
+	def run(self, budget:int) -> int:
+		"""
+		Refreshes up to 'budget' jobs that are due, the longest waiting first, and appends
+		their snapshots to the history batch by batch. Returns the number of refreshed jobs
+		"""
+		now = datetime.now()
+		job_ids = self.job_data.due_refreshes(self.schedule,now,budget)
+		self.logger.info(f"{len(job_ids)} jobs are due for a refresh")
+		n_refreshed = 0
+		for i in range(0,len(job_ids),self.batch_size):
+			with metrics.timer("refresh.batch"):
+				snapshots = self.refresh_batch(job_ids[i:i+self.batch_size],now)
+			self.job_data.add_history(snapshots)
+			metrics.incr("refresh.jobs",len(snapshots))
+			n_refreshed += len(snapshots)
+		self.logger.info(f"Refreshed {n_refreshed} jobs")
+		return n_refreshed
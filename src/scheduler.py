@@ -0,0 +1,109 @@
+"""
+Schedules the search queries between the scrapper processes.
+Overlapping queries (e.g. "python developer" and "backend engineer") find many of the same
+jobs. The queries are ordered by their recent yield (new jobs per search page), so the
+ones that find most of the new jobs go first, and the queries are spread over several
+worker processes. Each job is claimed in a table of the jobs database before it's
+scraped, so it's scraped by one worker only, across queries, processes and restarts.
+"""
+import sqlite3
+from datetime import datetime, timedelta
+from logging import Logger
+from time import time
+from typing import Iterable
+from .contracts import JobData
+
+
+class QueryScheduler():
+	"""
+	window_days: The yield of a query is measured on its crawls of the last 'window_days' days
+	"""
+	def __init__(self, job_data:JobData, logger:Logger, window_days:float=14) -> None:
+		self.job_data = job_data
+		self.logger = logger
+		self.window_days = window_days
+
+	def order(self, queries:list[str], first:str|None=None) -> list[str]:
+		"""
+		Orders the queries by yield, highest first. The queries without a recent crawl go
+		before all the others, since their yield is unknown. Ties keep the given order.
+		'first' (e.g. the query of an interrupted run) is always put first
+		"""
+		yields = self.job_data.query_yields(datetime.now() - timedelta(days=self.window_days))
+		ordered = sorted(queries,key=lambda query: -yields.get(query,float("inf")))
+		if first is not None and first in ordered:
+			ordered.remove(first)
+			ordered.insert(0,first)
+		self.logger.info("Query order: " + ", ".join(
+			f"'{query}' ({yields[query]:.2f} new jobs/page)" if query in yields else f"'{query}' (new)"
+			for query in ordered
+		))
+		return ordered
+
+
+class JobClaims():
+	"""
+	Claims of the job ids being scraped, in the 'job_claim' table of the jobs database.
+	A claim succeeds only if the job is not stored yet and no other worker holds a live
+	claim on it. The claims are released once the jobs are persisted. The claims of a
+	worker that dies are taken over once they're older than 'lease_minutes', or right away
+	by the restarted worker with the same name.
+	"""
+	def __init__(self, path:str, worker:str, lease_minutes:float=30) -> None:
+		self.worker = worker
+		self.lease = lease_minutes * 60
+		self.conn = sqlite3.connect(path,timeout=30)
+		self.conn.execute("PRAGMA journal_mode=WAL")
+		self.conn.executescript("""
+		CREATE TABLE IF NOT EXISTS job_claim (
+			job_id INTEGER PRIMARY KEY,
+			worker TEXT NOT NULL,
+			claimed_at REAL NOT NULL
+		);
+		""")
+		self.conn.commit()
+		self._released: list[tuple] = []
+
+	def claim_many(self, job_ids:Iterable[int]) -> set[int]:
+		"""
+		Claims the jobs in one transaction. Returns the ids that are claimed by this worker
+		"""
+		now = time()
+		claimed = set()
+		with self.conn:
+			for job_id in job_ids:
+				# A single statement, so the check and the claim are atomic
+				cursor = self.conn.execute("""
+				INSERT INTO job_claim (job_id, worker, claimed_at)
+				SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM details WHERE job_id = ?)
+				ON CONFLICT(job_id) DO UPDATE SET worker = excluded.worker, claimed_at = excluded.claimed_at
+				WHERE job_claim.worker = excluded.worker OR job_claim.claimed_at < ?
+				""",(int(job_id),self.worker,now,int(job_id),now - self.lease))
+				if cursor.rowcount == 1:
+					claimed.add(int(job_id))
+		return claimed
+
+	def release(self, job_id:int):
+		"""
+		The release is written on the next 'flush'. Flush the job data first, otherwise
+		another worker may claim a job that is not stored yet
+		"""
+		self._released.append((int(job_id),self.worker))
+
+	def flush(self):
+		if len(self._released) > 0:
+			with self.conn:
+				self.conn.executemany("DELETE FROM job_claim WHERE job_id = ? AND worker = ?",self._released)
+			self._released = []
+
+	def release_all(self):
+		"""
+		Releases every claim of this worker, e.g. of the jobs that failed to scrape
+		"""
+		self._released = []
+		with self.conn:
+			self.conn.execute("DELETE FROM job_claim WHERE worker = ?",(self.worker,))
+
+	def close(self):
+		self.flush()
+		self.conn.close()
@@ -1,9 +1,7 @@
 import glob
-import json
 import re
-import pandas as pd
 import os
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 from pathlib import Path
 from logging import Logger, getLogger
 from selenium import webdriver
@@ -11,16 +9,32 @@ from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.chrome.options import Options
 from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from concurrent.futures import Future
 from ast import literal_eval
-from time import sleep
-from .contracts import JobData
+from .contracts import JobData, APPLY_LINK_PENDING
 from .utils import retry, ScrapperException
-from .matcher import fuzz_match, find_matches
+from .matcher import SkillMatcher
+from .pool import ScrapperPool
+from . import parsers
+from .waits import PageReadiness
+from .frontier import LinkFrontier
+from .checkpoint import Checkpoint
+from . import metrics
+from .pipeline import ScrapePipeline
+from .lean_profile import apply_lean_options, block_resources
+from .governor import Throttle
+from .session import DriverSession
+from .vault import SessionVault, check_signed_in, driver_cookies, inject_cookies
+
+# The HTTP stages (and 'requests') are only imported when they're used
+if TYPE_CHECKING:
+	from .http_fetch import HttpFetcher
+	from .scheduler import JobClaims
 
 job_id_pattern = re.compile(r".*view\/(\d*).*")
 extract_number_pattern = re.compile(r"\D*(\d*)\D*")
 post_time_pattern = re.compile(r".* (.*?)s? ago")
-skills_text_pattern = re.compile(r"(.*)\n?.*")
 
 
 class Scrapper():
@@ -34,23 +48,84 @@ class Scrapper():
 			debug_address:str|None=None,
 			max_n_jobs:int = 500,
 			driver_logging:bool = True,
-			user_data_dir:str|None = None
+			user_data_dir:str|None = None,
+			n_workers:int = 1,
+			wait_timeouts:dict[str,float]|None = None,
+			checkpoint_interval:float = 10,
+			checkpoint_every:int = 20,
+			incremental:bool = False,
+			max_known_pages:int = 2,
+			base_url:str = "https://www.linkedin.com",
+			lean:bool = False,
+			blocked_resources:list[str]|None = None,
+			page_load_strategy:Literal["normal","eager","none"]|None = None,
+			throttle:Throttle|None = None,
+			recycle_pages:int = 0,
+			recycle_rss_mb:float = 0,
+			recycle_minutes:float = 0,
+			prewarm_driver:bool = False,
+			fetch_mode:Literal["browser","http"] = "browser",
+			http_pool_size:int = 8,
+			http_skills_fallback:bool = True,
+			defer_apply_links:bool = False,
+			claims:"JobClaims|None" = None,
+			session_vault:str|None = None
 			) -> None:
 		self.driver_logging = driver_logging
+		# Can point to a stand-in server for testing and benchmarks
+		self.base_url = base_url.rstrip("/")
+		self.base_host = urlparse(self.base_url).hostname or ""
+		# Set by the process monitor to slow down or pause the page loads
+		self.throttle = throttle
 		self.driver_options = {
 			"disable_extension": disable_extension,
 			"headless": headless,
 			"load_timeout": load_timeout,
 			"debug_address": debug_address,
-			"user_data_dir": user_data_dir
+			"user_data_dir": user_data_dir,
+			"lean": lean,
+			"blocked_resources": blocked_resources,
+			"page_load_strategy": page_load_strategy
 		}
-		self.driver = self.setup_webdriver(**self.driver_options)
-		Path(os.environ["BACKUP_FOLDER"]).mkdir(exist_ok=True)
 		self.logger = logger if logger else getLogger()
+		# The cookies of the last signed-in session. See 'sign_in'
+		self.session_vault = session_vault
+		self.vault = SessionVault(session_vault,self.logger) if session_vault else None
+		self.session_options = {
+			"recycle_pages": recycle_pages,
+			"recycle_rss_mb": recycle_rss_mb,
+			"recycle_minutes": recycle_minutes,
+			"prewarm_driver": prewarm_driver
+		}
+		if debug_address is not None:
+			# We can't restart a browser we're only attached to
+			recycle_pages, recycle_rss_mb, recycle_minutes = 0, 0, 0
+		if prewarm_driver and user_data_dir is not None:
+			self.logger.warning("The spare webdriver can't share the profile folder. Pre-warming is disabled")
+			prewarm_driver = False
+		# Owns the webdriver and recycles it at the safe points. See 'recycle_session'
+		self.session = DriverSession(
+			lambda: self.setup_webdriver(**self.driver_options),
+			self.logger,
+			max_pages=recycle_pages,
+			max_rss_mb=recycle_rss_mb,
+			max_minutes=recycle_minutes,
+			prewarm=prewarm_driver
+		)
+		Path(os.environ["BACKUP_FOLDER"]).mkdir(exist_ok=True)
+		self.wait_timeouts = wait_timeouts
+		# Waits for pages to get ready. The timeouts are upper bounds, not fixed sleeps
+		self.readiness = PageReadiness(lambda: self.driver,self.logger,wait_timeouts)
 		self.driver_get_link = self.setup_get_link()
 		self.job_data = job_data
 		self.max_n_jobs = max_n_jobs
+		# In incremental mode the crawl of search pages stops early once the results are
+		# already known. See 'is_crawl_caught_up'
+		self.incremental = incremental
+		self.max_known_pages = max_known_pages
 		self.crawl_time = None
+		# With more than one worker, the job pages are scraped by a pool of webdrivers
+		self.pool = ScrapperPool(self,n_workers) if n_workers > 1 else None
 		"""
 		self.state
 		This value is exclusively used to save the current state (progress).
@@ -59,11 +134,19 @@ class Scrapper():
 			"query": The present query,
 			"stage": either crawling_links_list or scrapping_each_link,
 			"data": if stage = crawling_links_list -> data is the last page
-				if stage = scrapping_each_link -> data is the last job_id
+				if stage = scrapping_each_link -> data is the last completed job_id (informative,
+				the run resumes from the links of the frontier that are not done)
 			"attempt": number of times the state is accessed. Used for limit the 
 				persistence
 		}
+		The state is written to the file by self.checkpoint at the safe points only
 		"""
+		self.checkpoint = Checkpoint(
+			f"{os.environ['BACKUP_FOLDER']}/{os.environ['SCRAP_STATE_FILE']}",
+			self.logger,
+			flush_interval=checkpoint_interval,
+			flush_every=checkpoint_every
+		)
 		self.state: dict|None = self.read_state()
 
 		# Get MY_SKILLS from env if available and parse it to a list
@@ -71,11 +154,75 @@ class Scrapper():
 			self.my_skills = literal_eval(os.environ["MY_SKILLS"])
 		else:
 			self.my_skills = None
+		self.matcher = SkillMatcher(self.my_skills) if self.my_skills else None
+		# In the "http" fetch mode the job pages are downloaded without the browser, with the
+		# cookies of the webdriver session. The skills need a click (the skills modal), so if
+		# 'http_skills_fallback' is set the browser opens the pages with skills only to read
+		# them, the rest is taken from the fetched page. See 'scrape_fetched'
+		self.fetch_mode = fetch_mode
+		self.http_pool_size = http_pool_size
+		self.http_skills_fallback = http_skills_fallback
+		if fetch_mode == "http" and not http_skills_fallback and self.matcher is not None:
+			self.logger.warning("The http fetch mode runs without the skills fallback: the skills are not scraped and MY_SKILLS is not matched")
+		self.fetcher: "HttpFetcher|None" = None
+		# Store a pending marker instead of opening the external apply page of each job.
+		# See 'resolve_apply_links'. The http fetch mode always defers them
+		self.defer_apply_links = defer_apply_links or fetch_mode == "http"
+		# Shared with the other scrapper processes, so that each job is scraped by one of them
+		self.claims = claims
+
+	@property
+	def driver(self):
+		return self.session.driver
 
 	def re_init_driver(self):
 		self.logger.debug("Re-Initializing the webdriver.")
-		self.driver.quit()
-		self.driver = self.setup_webdriver(**self.driver_options)
+		if self.pool is not None:
+			self.pool.close()
+		self.session.replace(self.restore_session)
+
+	def recycle_session(self):
+		"""
+		Called between two links. Closes the stray tabs and replaces the webdriver if it
+		has loaded too many pages, uses too much memory or is running for too long
+		"""
+		if self.session.maybe_recycle(self.restore_session):
+			metrics.incr("driver.recycles")
+
+	def restore_session(self,driver,cookies:list[dict]):
+		"""
+		Carries the cookies of the old session to the new webdriver, so we stay signed in
+		"""
+		self.sign_in([cookie for cookie in cookies if self.base_host.endswith(cookie.get("domain","").lstrip("."))])
+
+	def spawn_worker(self,worker_id:int):
+		"""
+		Creates a scrapper with its own webdriver to be used as a pool worker.
+		Chrome can't share a profile between sessions, so each worker gets its own profile folder
+		"""
+		options = dict(self.driver_options,debug_address=None)
+		if options["user_data_dir"] is not None:
+			options["user_data_dir"] = f"{options['user_data_dir']}_worker{worker_id}"
+		return Scrapper(
+			job_data=None,
+			logger=self.logger,
+			max_n_jobs=self.max_n_jobs,
+			driver_logging=self.driver_logging,
+			wait_timeouts=self.wait_timeouts,
+			base_url=self.base_url,
+			throttle=self.throttle,
+			defer_apply_links=self.defer_apply_links,
+			session_vault=self.session_vault,
+			**self.session_options,
+			**options
+		)
+
+	def quit(self):
+		if self.pool is not None:
+			self.pool.close()
+		if self.fetcher is not None:
+			self.fetcher.close()
+		self.session.quit()
 
 	def setup_webdriver(
 			self,
@@ -83,10 +230,23 @@ class Scrapper():
 			headless=True,
 			load_timeout=12,
 			debug_address:str|None=None,
-			user_data_dir:str|None=None
+			user_data_dir:str|None=None,
+			lean:bool=False,
+			blocked_resources:list[str]|None=None,
+			page_load_strategy:Literal["normal","eager","none"]|None=None
 		):
+		"""
+		lean: Blocks the resource types in 'blocked_resources' (see lean_profile) and runs
+			Chrome with low overhead flags. Unless 'page_load_strategy' is set, it also
+			stops waiting for the page load once the DOM is ready (eager). The readiness
+			waits make sure the elements we read are there.
+		"""
 		#TODO: Load options from a file or other external source
 		options = Options()
+		if page_load_strategy is None and lean:
+			page_load_strategy = "eager"
+		if page_load_strategy is not None:
+			options.page_load_strategy = page_load_strategy
 		if debug_address is None:
 			if user_data_dir is not None:
 				options.add_argument(f"user-data-dir={user_data_dir}")
@@ -97,6 +257,8 @@ class Scrapper():
 				options.add_argument("--disable-extensions")
 			if headless:
 				options.add_argument("--headless")
+			if lean:
+				apply_lean_options(options,blocked_resources)
 		else:
 			# Example: google-chrome --remote-debugging-port=9222 --remote-allow-origins=*
 			options.add_experimental_option("debuggerAddress", debug_address)
@@ -107,6 +269,8 @@ class Scrapper():
 		driver = webdriver.Chrome(options=options,service=service) #type: ignore
 		if load_timeout > 0:
 			driver.set_page_load_timeout(load_timeout)
+		if lean:
+			block_resources(driver,blocked_resources)
 		return driver
 
 
@@ -117,13 +281,18 @@ class Scrapper():
 			retry_multiplier=float(os.environ["DISCONNECT_MULTIPLIER"]),
 			max_retry_attempts=int(os.environ["DISCONNECT_MAX_RETRIES"])
 		)
+		@metrics.timed("driver_get_link")
 		def func(link):
+			if self.throttle is not None:
+				self.throttle.wait()
 			self.logger.debug(f"Get URL: {link}")
 			try:
 				self.driver.get(link)
+				self.session.page_loaded()
 				return True
 			except TimeoutException:
 				self.logger.warning("Page load timed out!")
+				metrics.incr("page_load_timeouts")
 				return True
 			except WebDriverException as e:
 				if e.msg is not None and (e.msg.find("ERR_INTERNET_DISCONNECTED") != -1 or \
@@ -133,9 +302,39 @@ class Scrapper():
 					raise Exception("Webdriver Exception:",e.msg)
 		return func
 
-	def sign_in(self):
+	def restore_signed_in_session(self,cookies:list[dict]) -> bool:
+		"""
+		Puts the cookies in the webdriver and checks over HTTP that they're accepted,
+		without loading any page
+		"""
+		if len(cookies) == 0:
+			return False
+		inject_cookies(self.driver,cookies,self.base_url,self.logger)
+		signed_in = check_signed_in(cookies,self.base_url,self.driver.execute_script("return navigator.userAgent"))
+		if signed_in is False:
+			self.logger.info("The saved session is rejected")
+			metrics.incr("sign_in.rejected_sessions")
+		return signed_in is True
+
+	def save_session(self):
+		if self.vault is not None:
+			self.vault.save(driver_cookies(self.driver,self.base_host))
+
+	def sign_in(self,cookies:list[dict]|None=None):
+		"""
+		Restores 'cookies' (e.g. of a recycled webdriver) or the saved session. The home page
+		is only loaded, and the credentials entered, if they're not accepted
+		"""
+		if cookies is None or len(cookies) == 0:
+			cookies = self.vault.load() if self.vault is not None else []
+		if self.restore_signed_in_session(cookies):
+			self.logger.info("Signed in with the saved session")
+			metrics.incr("sign_in.restored")
+			return
 		self.logger.info("Begin Sign-in")
-		self.driver_get_link('https://www.linkedin.com')
+		metrics.incr("sign_in.full")
+		self.driver_get_link(self.base_url)
+		self.readiness.wait("document")
 		title = self.driver.find_element(By.XPATH,"//title").parent.title
 		pattern = re.compile(r"log\s?-?in|sign\s?-?in|sign\s?-?up",re.IGNORECASE)
 
@@ -146,7 +345,7 @@ class Scrapper():
 				self.driver.find_element(by=By.ID,value='session_key').send_keys(os.environ["LINKEDIN_USER"])
 				self.driver.find_element(by=By.ID,value='session_password').send_keys(os.environ["LINKEDIN_PASSWORD"])# Submit the login form
 				self.driver.find_element(By.XPATH,"//button[contains(@data-id,'sign-in-form__submit-btn')]").click()
-				sleep(5)
+				self.readiness.wait("sign_in_landing")
 			except WebDriverException as e:
 				self.logger.error("Error signing in. Webdriver exception")
 				raise Exception(e.msg)
@@ -155,47 +354,76 @@ class Scrapper():
 				raise e
 		else:
 			self.logger.info("Already signed in!")
+		self.save_session()
 
-	def get_job_links_list(self,query:str,backup_path:str,start_page:int|None=0):
+	def get_job_links_list(self,query:str,frontier:LinkFrontier,start_page:int|None=0):
 		# set the 'start_page' to None to skip this stage
 		if start_page is None:
 			return
 		self.logger.debug(f"Crawling job links for query: '{query}' - Max number of job links: {self.max_n_jobs}")
 		keywords = query.replace(" ","%20") # breaking down the query into keywords
 		assert self.state is not None
-		self.set_state({"stage":"crawling_links_list"})
+		self.set_state({"stage":"crawling_links_list"},flush=True)
+		last_crawl_time = self.job_data.last_crawl_time(query) if self.job_data and self.incremental else None
+		known_pages = 0
+		n_pages = 0
 		for p in range(start_page,self.max_n_jobs,25):
+			self.recycle_session()
 			self.set_state({"data":p})
-			url = f'https://www.linkedin.com/jobs/search/?distance=250&geoId=101174742&keywords={keywords}&f_TPR=r604800&sortBy=DD'
+			url = f'{self.base_url}/jobs/search/?distance=250&geoId=101174742&keywords={keywords}&f_TPR=r604800&sortBy=DD'
 			url += f"&start={p}"
 			self.driver_get_link(url)
-			sleep(5)
-			no_match = self.driver.find_elements(By.XPATH,"//h1[text()[contains(.,'No matching jobs found.')]]")
-			if len(no_match) > 0:
+			self.readiness.wait("search_results")
+			tree = parsers.parse_html(self.driver.page_source)
+			n_pages += 1
+			if parsers.has_no_match(tree):
 				self.logger.debug(f"No more related job found for {keywords}. breaking.")
 				break
-			divs = self.driver.find_elements(by=By.XPATH, value= "//div[contains(@class, 'job-card-container')]")
-			sleep(1)
-			for div_element in divs:
-				a_tags = div_element.find_elements(by=By.XPATH,value=".//a")
-				for a_tag in a_tags:
-					href = a_tag.get_attribute("href").split("?")[0] # type: ignore
-					self.backup_data({"href":href,"page":p},backup_path)
+			page_job_ids = set()
+			for href in parsers.parse_job_card_links(tree,url):
+				job_id = job_id_pattern.findall(href)
+				if len(job_id) > 0:
+					frontier.add(job_id[0],href,p)
+					page_job_ids.add(int(job_id[0]))
+			frontier.flush_links()
+			if self.checkpoint.due():
+				self.checkpoint.flush()
+			self.serve_checkpoint_request(frontier)
+			if self.incremental:
+				known_pages = known_pages + 1 if self.is_page_known(page_job_ids) else 0
+				if self.is_crawl_caught_up(known_pages,parsers.parse_job_card_dates(tree),last_crawl_time):
+					self.logger.debug(f"The results of '{query}' are already known from page {p}. breaking.")
+					break
+		# Used to order the queries by their yield. See QueryScheduler
+		if self.job_data and self.crawl_time is not None:
+			self.job_data.record_crawl(query,self.crawl_time,n_pages)
+
+	def is_page_known(self,page_job_ids:set[int]):
+		if not self.job_data or len(page_job_ids) == 0:
+			return False
+		return len(self.job_data.exists_many(page_job_ids)) == len(page_job_ids)
+
+	def is_crawl_caught_up(self,known_pages:int,page_dates:list,last_crawl_time:datetime|None):
+		"""
+		The results are sorted by date, so the rest of the pages are already crawled if either
+		the last 'max_known_pages' pages had no new job, or all the jobs of the page are posted
+		before the day of the last crawl of the query
+		"""
+		if known_pages >= self.max_known_pages:
+			return True
+		if last_crawl_time is not None and len(page_dates) > 0:
+			return max(page_dates) < last_crawl_time.date()
+		return False
 
+	@metrics.timed("get_skills")
 	def get_skills(self):
 		self.logger.debug("		+ Getting Required Skills")
-		el = self.driver.find_elements(By.XPATH,"//span[text()[contains(.,'Show all skills') or contains(.,'Show qualification details')]]")
+		el = self.driver.find_elements(By.XPATH,parsers.SKILLS_BUTTON_XPATH)
 		if len(el) != 1:
 			return []
 		el[0].click()
-		sleep(3)
-		table = self.driver.find_elements(By.XPATH, "//ul[contains(@class,'job-details-skill-match-status-list')]")
-		if len(table) != 1:
-			return []
-		skills = table[0].find_elements(By.TAG_NAME, "li")
-		res = []
-		for skill in skills:
-			res.append(skills_text_pattern.findall(skill.text)[0])
+		self.readiness.wait("skills_modal")
+		res = parsers.parse_skills(parsers.parse_html(self.driver.page_source))
 		el = self.driver.find_elements(By.XPATH,"//span[text()[contains(.,'Done')]]")
 		if len(el) == 0:
 			self.logger.warning("Job qualification details is opened, but close button not found")
@@ -219,24 +447,30 @@ class Scrapper():
 		self.logger.debug(f"Screenshot taken: {img_file_name}.{file_type}")
 		return True
 
+	@metrics.timed("scrape_job_page")
 	def scrape_job_page(self,link:str,job_id:int):
 		self.logger.debug(f"Scraping job page at {link}")
 		self.driver_get_link(link)
-		sleep(3)
-		alert = self.driver.find_elements(By.XPATH,"//div[contains(@role,'alert')]")
-		if len(alert) > 0:
-			self.logger.warning("The job is expired")
-		title = self.driver.find_element(By.XPATH,"//h1").accessible_name
-		details_el =  self.driver.find_element(By.XPATH,"//div[contains(@class,'job-details-jobs-unified-top-card__primary-description-container')]")
-		detail_items = details_el.text.split(" · ")
-		if len(detail_items) == 3:
-			detail_items.append("0 applicants")
-		[company_name,location,post_time_raw,n_applicants] = detail_items
-		n_applicants = extract_number_pattern.findall(n_applicants)[0]
-		apply_link = self.get_apply_link()
+		self.readiness.wait("job_details")
+		tree = parsers.parse_html(self.driver.page_source)
+		top_card = parsers.parse_job_top_card(tree)
+		if self.defer_apply_links:
+			apply_link = APPLY_LINK_PENDING if parsers.has_apply_button(tree) else None
+		else:
+			apply_link = self.get_apply_link()
 		skills = self.get_skills()
-		post_time,is_repost = self.convert_post_time(post_time_raw)
 		self.logger.debug("Scrapping Finished")
+		return self.job_from_top_card(job_id,top_card,skills,apply_link)
+
+	def job_from_top_card(self,job_id:int,top_card:dict,skills:list[str]|None,apply_link:str|None):
+		if top_card["is_expired"]:
+			self.logger.warning("The job is expired")
+		title = top_card["title"]
+		company_name = top_card["company_name"]
+		location = top_card["location"]
+		post_time_raw = top_card["post_time_raw"]
+		n_applicants = extract_number_pattern.findall(top_card["n_applicants_raw"])[0]
+		post_time,is_repost = self.convert_post_time(post_time_raw)
 		return {
 			"job_id": job_id,
 			"title": title, 
@@ -251,7 +485,7 @@ class Scrapper():
 		}
 
 	def click_apply_button(self):
-		buttons = self.driver.find_elements(By.XPATH,"//button[contains(@class,'jobs-apply-button')]")
+		buttons = self.driver.find_elements(By.XPATH,parsers.APPLY_BUTTON_XPATH)
 		for button in buttons:
 			if button.text == "Apply":
 				button.click()
@@ -267,6 +501,7 @@ class Scrapper():
 			self.logger.warning("Error getting tab URL. Unknown Error")
 		return None
 
+	@metrics.timed("get_apply_link")
 	def get_apply_link(self):
 		self.logger.debug("		+ Getting Apply Link")
 		res =  self.click_apply_button()
@@ -282,34 +517,188 @@ class Scrapper():
 				self.driver.switch_to.window(original_tab)
 		return external_url
 
-	def get_backup_path(self,file_name_stub:str):
+	def browser_apply_link(self,job_id:int):
+		self.driver_get_link(f"{self.base_url}/jobs/view/{job_id}/")
+		self.readiness.wait("job_details")
+		return self.get_apply_link()
+
+	def resolve_apply_links(self,browser_fallback:bool=True):
+		"""
+		Resolves the apply links left pending by the scraping (see 'defer_apply_links')
+		"""
+		if not self.job_data:
+			return 0
+		from .apply_links import ApplyLinkResolver
+		return ApplyLinkResolver(
+			self.job_data,
+			self.get_fetcher().session,
+			self.base_url,
+			self.logger,
+			concurrency=self.http_pool_size,
+			fallback=self.browser_apply_link if browser_fallback else None
+		).run()
+
+	def browser_top_card(self,job_id:int):
+		self.driver_get_link(f"{self.base_url}/jobs/view/{job_id}/")
+		self.readiness.wait("job_details")
+		return parsers.parse_job_top_card(parsers.parse_html(self.driver.page_source))
+
+	def refresh_jobs(self,budget:int,schedule:list[tuple[float,float]]|None=None,browser_fallback:bool=True):
+		"""
+		Re-reads the number of applicants of up to 'budget' stored jobs that are due for a
+		refresh. See JobRefresher
+		"""
+		if not self.job_data or budget <= 0:
+			return 0
+		from .refresh import JobRefresher
+		return JobRefresher(
+			self.job_data,
+			self.get_fetcher(),
+			self.base_url,
+			self.logger,
+			schedule=schedule,
+			fallback=self.browser_top_card if browser_fallback else None
+		).run(budget)
+
+	def get_backup_path(self,file_name_stub:str,extension:str=".csv"):
 		folder = os.environ["BACKUP_FOLDER"]
-		file_name = file_name_stub + ".csv"
+		file_name = file_name_stub + extension
 				
 		return f"{folder}/{file_name}"
 
-	def backup_data(self,data:dict|list,backup_path:str):
-		df = pd.DataFrame([data])
-		if os.path.exists(backup_path):
-			df.to_csv(backup_path,mode="a",header=False,index=False)
-		else:
-			df.to_csv(backup_path,mode="w",index=False)
-
 	def scrap_a_job_link(self,link:str):
 		job_id = job_id_pattern.findall(link)[0]
-		self.set_state({"data":job_id})
 		if self.job_data and not self.job_data.exists(job_id):
-			try:
-				scraped_data = self.scrape_job_page(link,job_id)
-				return scraped_data
-			except WebDriverException as e:
-				self.logger.error(f"Webdriver error while scraping the link: {e.msg}")
-			except Exception as e:
-				self.logger.error(f"Unknown error while scraping the link. {e}")
-			self.take_screenshot("png")
+			return self.scrape_link(link,job_id)
 		self.logger.log(msg=f"Job ID {job_id} already exists!",level=8)
 		return None
 
+	def scrape_link(self,link:str,job_id:int|None=None):
+		"""
+		Scrapes the job page without checking the database or touching the state.
+		Returns None if scraping fails
+		"""
+		if job_id is None:
+			job_id = job_id_pattern.findall(link)[0]
+		try:
+			self.recycle_session()
+			return self.scrape_job_page(link,job_id)
+		except WebDriverException as e:
+			self.logger.error(f"Webdriver error while scraping the link: {e.msg}")
+		except Exception as e:
+			self.logger.error(f"Unknown error while scraping the link. {e}")
+		metrics.incr("jobs.failed")
+		self.take_screenshot("png")
+		return None
+
+	def get_fetcher(self) -> "HttpFetcher":
+		"""
+		The HTTP fetcher is created on the first use, after we've signed in
+		"""
+		if self.fetcher is None:
+			from .http_fetch import HttpFetcher
+			self.fetcher = HttpFetcher.from_driver(self.driver,self.logger,pool_size=self.http_pool_size)
+		return self.fetcher
+
+	@metrics.timed("scrape_skills")
+	def scrape_skills(self,link:str) -> list[str]:
+		"""
+		Opens the job page in the browser only to read the skills modal
+		"""
+		self.recycle_session()
+		self.driver_get_link(link)
+		self.readiness.wait("skills_button")
+		return self.get_skills()
+
+	@metrics.timed("scrape_fetched")
+	def scrape_fetched(self,item:tuple[str,Future]):
+		"""
+		Scrapes a job page fetched by the HTTP fetcher. Falls back to the browser if the page
+		can't be fetched or parsed. If the skills are behind the skills button, the browser
+		only reads the skills modal (see 'http_skills_fallback')
+		"""
+		link,future = item
+		job_id = job_id_pattern.findall(link)[0]
+		page_source = future.result()
+		job = None
+		needs_skills = False
+		if page_source is not None:
+			try:
+				tree = parsers.parse_html(page_source)
+				# The apply button opens the external page with javascript
+				apply_link = APPLY_LINK_PENDING if parsers.has_apply_button(tree) else None
+				job = self.job_from_top_card(job_id,parsers.parse_job_top_card(tree),parsers.parse_skills(tree) or None,apply_link)
+				# The server-rendered page never shows the skills
+				needs_skills = job["skills"] is None and (parsers.has_skills_button(tree) or parsers.is_public_page(tree))
+			except Exception as e:
+				self.logger.warning(f"Error parsing the fetched job page {link}: {e}")
+		if job is None:
+			metrics.incr("http.fallbacks")
+			return self.scrape_link(link,job_id)
+		if needs_skills and self.http_skills_fallback:
+			metrics.incr("http.skills_fallbacks")
+			try:
+				job["skills"] = self.scrape_skills(link)
+			except Exception as e:
+				# Left pending, so the job is scraped with its skills on the next run
+				self.logger.error(f"Error reading the skills of {link} in the browser: {e}")
+				metrics.incr("jobs.failed")
+				return None
+		return job
+
+	def iter_new_links(self,frontier:LinkFrontier):
+		"""
+		Lazily yields the (job_id, link) of the pending links of the frontier.
+		The links whose job id is already stored, or claimed by another scrapper process,
+		are marked as done and skipped
+		"""
+		for chunk in frontier.pending():
+			known = self.job_data.exists_many(job_id for job_id,_ in chunk) if self.job_data else set()
+			self.logger.debug(f"{len(known)} out of {len(chunk)} crawled jobs already exist")
+			metrics.incr("jobs.duplicates",len(known))
+			if self.claims is not None:
+				new_ids = [job_id for job_id,_ in chunk if job_id not in known]
+				claimed = self.claims.claim_many(new_ids)
+				metrics.incr("jobs.claimed_elsewhere",len(new_ids)-len(claimed))
+				known = known.union(job_id for job_id in new_ids if job_id not in claimed)
+			for job_id,link in chunk:
+				if job_id in known:
+					frontier.mark_done(job_id)
+				else:
+					yield job_id,link
+
+	def persist_results(self,results:list[dict],frontier:LinkFrontier,query:str):
+		"""
+		Writes the scraped (and matched) jobs and records them as done
+		"""
+		if self.job_data:
+			self.job_data.write_many([{**res,"original_query":query,"crawl_time":self.crawl_time} for res in results])
+		for res in results:
+			frontier.mark_done(res["job_id"])
+			if self.claims is not None:
+				self.claims.release(res["job_id"])
+		metrics.incr("jobs.scraped",len(results))
+		self.set_state({"data":results[-1]["job_id"]})
+		if frontier.should_flush() or self.checkpoint.due():
+			self.flush_progress(frontier)
+		self.serve_checkpoint_request(frontier)
+
+	def serve_checkpoint_request(self,frontier:LinkFrontier):
+		"""
+		Checkpoints if the process monitor asked for it (before restarting the scrapper)
+		"""
+		if self.throttle is not None:
+			self.throttle.serve_checkpoint(lambda: self.flush_progress(frontier))
+
+	def flush_progress(self,frontier:LinkFrontier):
+		# The job data goes first, so a link is never marked as done before its job is stored
+		if self.job_data:
+			self.job_data.flush()
+		if self.claims is not None:
+			self.claims.flush()
+		frontier.flush()
+		self.checkpoint.flush()
+
 	@staticmethod
 	def convert_post_time(str_time:str):
 		t = int(extract_number_pattern.findall(str_time)[0])
@@ -319,20 +708,14 @@ class Scrapper():
 		return datetime.now() - delta, str_time.lower().find("reposted") != -1
 	
 	def read_state(self) -> dict|None:
-		file_path = f"{os.environ['BACKUP_FOLDER']}/{os.environ['SCRAP_STATE_FILE']}"
-		
-		if not os.path.exists(file_path):
-			self.logger.debug(f"No state file existed at {file_path}")
-			return None
-		
-		# TODO: Unify link backup data with the other data as sqlite
-		with open(file_path,"r") as f:
-			self.logger.debug(f"State file exists at {file_path}\nState={f.read()}")
-			f.seek(0)
-			return json.load(f)
-		
-
-	def set_state(self,state:dict|None=None):
+		return self.checkpoint.read()
+
+	@metrics.timed("set_state")
+	def set_state(self,state:dict|None=None,flush:bool=False):
+		"""
+		Updates the state in memory. The state file is written only if 'flush' is set or
+		no 'state' is given. Otherwise it's written at the next safe point
+		"""
 		accepted_keys = ["stage","data","attempt","query"]
 		if self.state is None:
 			self.state = {}
@@ -340,15 +723,15 @@ class Scrapper():
 			for key,val in state.items():
 				if key not in accepted_keys:
 					raise Exception("Illegal state key is set.")
-			self.state[key] = val
-
-		file_path = f"{os.environ['BACKUP_FOLDER']}/{os.environ['SCRAP_STATE_FILE']}"
-		with open(file_path,"w") as f:
-			json.dump(self.state,f)
-			# Since it's too frequent we won't catch it even at debug level. We set it to sub DEBUG (<10)
-			self.logger.log(msg=f"State file is written at {file_path}",level=8)
+				self.state[key] = val
+		self.checkpoint.save(self.state)
+		if flush or state is None:
+			self.checkpoint.flush()
 	
 	def del_state_and_backup(self):
+		# Buffered rows must be persisted before we lose the ability to resume
+		if self.job_data:
+			self.job_data.flush()
 		self.logger.debug(f"Deleting the state and backup files")
 		folder = os.environ['BACKUP_FOLDER']
 		if not os.path.exists(folder):
@@ -361,20 +744,21 @@ class Scrapper():
 				self.logger.debug(f"Removing {file}")
 				os.remove(file)
 		self.state = None
+		self.checkpoint.discard()
 
+	@metrics.timed("generate_match_columns")
 	def generate_match_columns(self,scraped_data,threshold: int=70):
-		if scraped_data and scraped_data["skills"] is not None and self.my_skills:
+		if scraped_data and scraped_data["skills"] is not None and self.matcher:
 			job_skills = scraped_data["skills"]
 			return {
-				"match_score": fuzz_match(job_skills,self.my_skills,method='partial'),
-				"top_matches": find_matches(job_skills,self.my_skills,threshold),
+				"match_score": self.matcher.fuzz_match(job_skills),
+				"top_matches": self.matcher.find_matches(job_skills,threshold),
 				"match_threshold": threshold
 			}
 		else:
 			return {}
 
 	def run_sequence(self,query:str,match_threshold=70):
-		links_backup_path = self.get_backup_path("crawl_links")
 		self.crawl_time = datetime.now()
 
 		start_page = 0
@@ -394,19 +778,54 @@ class Scrapper():
 		else:
 			self.state = {"query": query, "attempt":0}
 
-		
-		self.get_job_links_list(query,links_backup_path,start_page)
+		frontier = LinkFrontier(self.get_backup_path("crawl_links",".sqlite"))
+		try:
+			self.get_job_links_list(query,frontier,start_page)
 
-		links = pd.read_csv(links_backup_path)["href"].to_list()
-		assert self.state is not None
-		self.set_state({"stage":"scrapping_each_link"})
-		for link in links:
-			scraped_data = self.scrap_a_job_link(link)
-			if scraped_data is None:
-				continue
-			match_columns = self.generate_match_columns(scraped_data,match_threshold)
-			if self.job_data:
-				self.job_data.write_one(**scraped_data,**match_columns,original_query=query,crawl_time=self.crawl_time)
+			assert self.state is not None
+			if self.state.get("stage") != "scrapping_each_link":
+				self.set_state({"stage":"scrapping_each_link","data":None},flush=True)
+			# A resumed run scrapes every link that is not marked as done, including the
+			# ones that failed before the last completed job
+			links = self.iter_new_links(frontier)
+			add_match_columns = lambda scraped_data: {**scraped_data,**self.generate_match_columns(scraped_data,match_threshold)}
+			persist = lambda results: self.persist_results(results,frontier,query)
+			if self.fetch_mode == "http":
+				fetcher = self.get_fetcher()
+				# The pages are fetched ahead of the scrape stage, up to the size of its queue
+				ScrapePipeline(
+					scrape=self.scrape_fetched,
+					match=add_match_columns,
+					persist=persist,
+					logger=self.logger,
+					queue_size=self.http_pool_size,
+					on_idle=lambda: self.serve_checkpoint_request(frontier)
+				).run((link,fetcher.submit(link)) for _,link in links)
+			elif self.pool is not None:
+				# The links are fed lazily, so they're claimed chunk by chunk as the workers go
+				ScrapePipeline(
+					scrape=self.pool.scrapers(),
+					match=add_match_columns,
+					persist=persist,
+					logger=self.logger,
+					queue_size=2*self.pool.size,
+					on_idle=lambda: self.serve_checkpoint_request(frontier)
+				).run(link for _,link in links)
+			else:
+				ScrapePipeline(
+					scrape=self.scrap_a_job_link,
+					match=add_match_columns,
+					persist=persist,
+					logger=self.logger,
+					on_idle=lambda: self.serve_checkpoint_request(frontier)
+				).run(link for _,link in links)
+		finally:
+			self.flush_progress(frontier)
+			frontier.close()
+			if self.claims is not None:
+				# The jobs that failed are left to the next run
+				self.claims.release_all()
+		self.logger.debug(f"Page waits: {self.readiness.summary()}")
 		self.del_state_and_backup()
 
 	def manage_and_run(self,query:str,match_threshold=70):
@@ -422,6 +841,8 @@ class Scrapper():
 			self.logger.error(f"An unknown exception occurred:\n{e}")
 			raise ScrapperException(kind="unknown",e=e)
 		finally:
+			if self.job_data:
+				self.job_data.flush()
 			if self.state is not None:
 				self.set_state()
 
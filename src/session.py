@@ -0,0 +1,197 @@
+"""
+Lifecycle of the webdriver sessions. Headless Chrome grows in memory over a long run, so
+the session is recycled before it gets into trouble instead of after a webdriver error:
+after a number of pages, once the memory of the browser goes over a limit, or after some
+minutes. The recycling only happens at the safe points the scrapper asks for (between
+two links), and the cookies of the old session are carried to the new one so it stays
+signed in.
+"""
+from logging import Logger
+from threading import Thread
+from time import monotonic
+from typing import Any, Callable
+import psutil
+from selenium.common.exceptions import WebDriverException
+from .vault import driver_cookies
+
+
+def driver_rss(driver) -> int:
+	"""
+	Total rss in bytes of chromedriver and the browser processes it started
+	"""
+	process = getattr(getattr(driver,"service",None),"process",None)
+	if process is None:
+		return 0
+	rss = 0
+	try:
+		root = psutil.Process(process.pid)
+		for proc in [root] + root.children(recursive=True):
+			try:
+				rss += proc.memory_info().rss
+			except psutil.Error:
+				continue
+	except psutil.Error:
+		return 0
+	return rss
+
+def close_stray_tabs(driver) -> int:
+	"""
+	Closes every tab except the current one (e.g. the ones opened by the apply buttons).
+	Returns the number of closed tabs
+	"""
+	current = driver.current_window_handle
+	closed = 0
+	for tab in driver.window_handles:
+		if tab != current:
+			driver.switch_to.window(tab)
+			driver.close()
+			closed += 1
+	if closed > 0:
+		driver.switch_to.window(current)
+	return closed
+
+
+class DriverSession():
+	"""
+	Owns the webdriver of one scrapper and decides when to replace it.
+	create: Returns a new webdriver
+	max_pages, max_rss_mb, max_minutes: Recycle limits. 0 disables the limit
+	prewarm: Keeps a spare driver started in the background so a swap doesn't wait for
+		Chrome to start. It needs its own profile, so it can't be used with a fixed
+		'user-data-dir'
+	The first driver is started in the background too, so the caller can load everything
+	else while Chrome starts. Using 'driver' waits for it
+	"""
+	def __init__(
+			self,
+			create:Callable[[],Any],
+			logger:Logger,
+			max_pages:int=0,
+			max_rss_mb:float=0,
+			max_minutes:float=0,
+			prewarm:bool=False
+			) -> None:
+		self.create = create
+		self.logger = logger
+		self.max_pages = max_pages
+		self.max_rss = max_rss_mb * 2**20
+		self.max_minutes = max_minutes
+		self.prewarm = prewarm
+		self.n_recycles = 0
+		self._spare = None
+		self._spare_thread: Thread|None = None
+		self._driver = None
+		self._driver_error: BaseException|None = None
+		self._driver_thread: Thread|None = Thread(target=self._start_driver,name="webdriver-start",daemon=True)
+		self.n_pages = 0
+		self.started = monotonic()
+		self._driver_thread.start()
+
+	def _start_driver(self):
+		try:
+			self._driver = self.create()
+		except BaseException as e:
+			self._driver_error = e
+			return
+		# The spare is only started once the first driver is up
+		self._reset()
+
+	@property
+	def driver(self):
+		if self._driver_thread is not None:
+			self._driver_thread.join()
+			self._driver_thread = None
+			if self._driver_error is not None:
+				raise self._driver_error
+		return self._driver
+
+	@driver.setter
+	def driver(self, driver):
+		self._driver = driver
+
+	@property
+	def enabled(self) -> bool:
+		return self.max_pages > 0 or self.max_rss > 0 or self.max_minutes > 0
+
+	def _reset(self):
+		self.n_pages = 0
+		self.started = monotonic()
+		if self.prewarm and self.enabled:
+			self._start_spare()
+
+	def _start_spare(self):
+		if self._spare is not None or (self._spare_thread is not None and self._spare_thread.is_alive()):
+			return
+		def work():
+			try:
+				self._spare = self.create()
+			except Exception as e:
+				self.logger.warning(f"Could not pre-warm a spare webdriver: {e}")
+		self._spare_thread = Thread(target=work,name="spare-webdriver",daemon=True)
+		self._spare_thread.start()
+
+	def _take_spare(self):
+		if self._spare_thread is not None:
+			self._spare_thread.join()
+			self._spare_thread = None
+		spare, self._spare = self._spare, None
+		return spare
+
+	def page_loaded(self):
+		self.n_pages += 1
+
+	def recycle_reason(self) -> str|None:
+		if self.max_pages > 0 and self.n_pages >= self.max_pages:
+			return f"{self.n_pages} pages"
+		if self.max_minutes > 0 and monotonic() - self.started >= self.max_minutes * 60:
+			return f"{self.max_minutes} minutes"
+		if self.max_rss > 0:
+			rss = driver_rss(self.driver)
+			if rss > self.max_rss:
+				return f"{rss/2**20:.0f}MB of memory"
+		return None
+
+	def replace(self, restore:Callable[[Any,list[dict]],None]|None=None):
+		"""
+		Quits the current driver and switches to a new one (the spare one if it's ready).
+		'restore' is called with the new driver and the cookies of the old one
+		"""
+		cookies = []
+		try:
+			cookies = driver_cookies(self.driver)
+		except WebDriverException:
+			self.logger.warning("Could not read the cookies of the old webdriver")
+		try:
+			self.driver.quit()
+		except WebDriverException:
+			pass
+		self.driver = self._take_spare() or self.create()
+		self.n_recycles += 1
+		self._reset()
+		if restore is not None:
+			restore(self.driver,cookies)
+		return self.driver
+
+	def maybe_recycle(self, restore:Callable[[Any,list[dict]],None]|None=None) -> bool:
+		"""
+		Called at a safe point. Closes the stray tabs and recycles the driver if it's due
+		"""
+		try:
+			if close_stray_tabs(self.driver) > 0:
+				self.logger.debug("Closed the stray tabs")
+		except WebDriverException:
+			self.logger.warning("Could not close the stray tabs")
+		if not self.enabled:
+			return False
+		reason = self.recycle_reason()
+		if reason is None:
+			return False
+		self.logger.info(f"Recycling the webdriver after {reason}")
+		self.replace(restore)
+		return True
+
+	def quit(self):
+		self.driver.quit()
+		spare = self._take_spare()
+		if spare is not None:
+			spare.quit()
@@ -3,7 +3,7 @@ from functools import wraps
 from logging import Logger
 from time import sleep
 from typing import Literal
-from webdriver_manager.chrome import ChromeDriverManager
+from . import metrics
 
 def retry(retry_timeout:int, logger:Logger ,retry_multiplier:float = 0, max_retry_attempts:int=5):
 	"""
@@ -30,6 +30,7 @@ def retry(retry_timeout:int, logger:Logger ,retry_multiplier:float = 0, max_retr
 						sys.exit(1)
 					else:
 						logger.warning(f"{func.__name__} requested retry for {reason}.")
+						metrics.incr("retries")
 						#TODO: The formula for retry time out is not correct!
 						t = (1+attempt*retry_multiplier)*retry_timeout
 						logger.info(f"Retry:{attempt}, Waiting for {t} seconds.")
@@ -46,6 +47,7 @@ def retry(retry_timeout:int, logger:Logger ,retry_multiplier:float = 0, max_retr
 def download_chromedriver():
 	"""Downloads Chrome Webdriver of Selenium
 	"""
+	from webdriver_manager.chrome import ChromeDriverManager
 	print(ChromeDriverManager().install())
 
 
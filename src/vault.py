@@ -0,0 +1,131 @@
+"""
+Keeps the signed-in LinkedIn session between runs. Loading the home page of LinkedIn just
+to find out whether we're signed in is one of the heaviest page loads of a run, and it
+happens on every start, restart and recycled or pooled webdriver. Instead, the cookies of
+the signed-in session are saved after a sign-in and put straight into the new drivers
+through the DevTools protocol, without loading any page. Whether they're still accepted is
+checked with a single HTTP request that doesn't download the page.
+"""
+import json
+import os
+from logging import Logger
+from pathlib import Path
+from time import time
+from selenium.common.exceptions import WebDriverException
+
+# A signed-out request to these is redirected to one of the SIGNED_OUT_PATHS
+SIGNED_IN_PATH = "/feed/"
+SIGNED_OUT_PATHS = ["login","authwall","signup","checkpoint","uas/"]
+
+
+def from_cdp_cookie(cookie:dict) -> dict:
+	"""
+	Converts a cookie of the DevTools protocol to the format of 'driver.get_cookies'
+	"""
+	res = {key: cookie[key] for key in ["name","value","domain","path","secure","httpOnly","sameSite"] if key in cookie}
+	if not cookie.get("session",False) and cookie.get("expires",-1) > 0:
+		res["expiry"] = int(cookie["expires"])
+	return res
+
+def to_cdp_cookie(cookie:dict) -> dict:
+	res = {key: cookie[key] for key in ["name","value","domain","path","secure","httpOnly"] if key in cookie}
+	if cookie.get("sameSite") in ("Strict","Lax","None"):
+		res["sameSite"] = cookie["sameSite"]
+	if "expiry" in cookie:
+		res["expires"] = cookie["expiry"]
+	return res
+
+def driver_cookies(driver, host:str|None=None) -> list[dict]:
+	"""
+	The cookies of the webdriver session, of all domains or of 'host' only. Unlike
+	'driver.get_cookies', it doesn't depend on the page that is open
+	"""
+	try:
+		cookies = [from_cdp_cookie(cookie) for cookie in driver.execute_cdp_cmd("Network.getAllCookies",{})["cookies"]]
+	except (WebDriverException,AttributeError,KeyError):
+		cookies = driver.get_cookies()
+	if host is None:
+		return cookies
+	return [cookie for cookie in cookies if host.endswith(cookie.get("domain","").lstrip("."))]
+
+def inject_cookies(driver, cookies:list[dict], base_url:str, logger:Logger) -> int:
+	"""
+	Puts the cookies in the webdriver session without loading a page. Falls back to loading
+	'base_url', since 'add_cookie' only works on the domain of the open page.
+	Returns the number of added cookies
+	"""
+	try:
+		driver.execute_cdp_cmd("Network.setCookies",{"cookies": [to_cdp_cookie(cookie) for cookie in cookies]})
+		return len(cookies)
+	except (WebDriverException,AttributeError):
+		logger.debug("Could not set the cookies through the DevTools protocol")
+	driver.get(base_url)
+	n = 0
+	for cookie in cookies:
+		try:
+			driver.add_cookie(cookie)
+			n += 1
+		except WebDriverException:
+			logger.debug(f"Could not restore the cookie '{cookie.get('name')}'")
+	return n
+
+def check_signed_in(cookies:list[dict], base_url:str, user_agent:str|None=None, timeout:float=10) -> bool|None:
+	"""
+	Requests a page that needs a signed-in user with the cookies, without following the
+	redirect or downloading the page. Returns None if the answer is not conclusive
+	"""
+	import requests
+	headers = {"User-Agent": user_agent} if user_agent else {}
+	jar = requests.cookies.RequestsCookieJar()
+	for cookie in cookies:
+		jar.set(cookie["name"],cookie["value"],domain=cookie.get("domain",""),path=cookie.get("path","/"))
+	try:
+		with requests.get(base_url.rstrip("/") + SIGNED_IN_PATH,cookies=jar,headers=headers,
+				timeout=timeout,allow_redirects=False,stream=True) as response:
+			if response.status_code == 200:
+				return True
+			location = response.headers.get("Location","")
+			if response.is_redirect and any(path in location for path in SIGNED_OUT_PATHS):
+				return False
+			return None
+	except requests.RequestException:
+		return None
+
+
+class SessionVault():
+	"""
+	The cookies of the last signed-in session, in a file only the user can read
+	"""
+	def __init__(self, path:str, logger:Logger) -> None:
+		self.path = path
+		self.logger = logger
+
+	def load(self) -> list[dict]:
+		"""
+		The saved cookies that haven't expired yet
+		"""
+		if not os.path.exists(self.path):
+			return []
+		try:
+			with open(self.path,"r") as f:
+				cookies = json.load(f)["cookies"]
+		except (OSError,ValueError,KeyError):
+			self.logger.warning(f"Could not read the session vault at {self.path}")
+			return []
+		now = time()
+		return [cookie for cookie in cookies if cookie.get("expiry",now+1) > now]
+
+	def save(self, cookies:list[dict]):
+		if len(cookies) == 0:
+			return
+		Path(self.path).parent.mkdir(parents=True,exist_ok=True)
+		tmp_path = self.path + ".tmp"
+		fd = os.open(tmp_path,os.O_WRONLY|os.O_CREAT|os.O_TRUNC,0o600)
+		with os.fdopen(fd,"w") as f:
+			json.dump({"saved_at": time(), "cookies": cookies},f)
+		os.replace(tmp_path,self.path)
+		self.logger.debug(f"The session is saved to {self.path}")
+
+	def clear(self):
+		if os.path.exists(self.path):
+			os.remove(self.path)
@@ -0,0 +1,96 @@
+from logging import Logger
+from time import monotonic
+from typing import Callable, Literal
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chrome.webdriver import WebDriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from . import parsers
+from . import metrics
+
+PageName = Literal["document","search_results","job_details","skills_button","skills_modal","sign_in_landing"]
+
+# The condition of each page being ready to be read
+READY_CONDITIONS: dict[str,Callable] = {
+	# Needed when the driver doesn't wait for the page load (page_load_strategy=none)
+	"document": lambda driver: driver.execute_script("return document.readyState") != "loading",
+	"search_results": EC.any_of(
+		EC.presence_of_element_located((By.XPATH,"//div[contains(@class, 'job-card-container')]")),
+		EC.presence_of_element_located((By.XPATH,parsers.NO_MATCH_XPATH))
+	),
+	"job_details": EC.all_of(
+		EC.presence_of_element_located((By.XPATH,parsers.TITLE_XPATH)),
+		EC.presence_of_element_located((By.XPATH,parsers.DETAILS_XPATH))
+	),
+	# The skills button is enough when the rest of the page is taken from a fetched copy
+	"skills_button": EC.presence_of_element_located((By.XPATH,parsers.SKILLS_BUTTON_XPATH)),
+	"skills_modal": EC.presence_of_element_located((By.XPATH,parsers.SKILLS_LIST_XPATH)),
+	"sign_in_landing": EC.any_of(
+		EC.url_contains("/feed"),
+		EC.url_contains("/checkpoint"),
+		EC.presence_of_element_located((By.ID,"global-nav"))
+	)
+}
+
+# Maximum seconds to wait for each page. These used to be fixed sleeps
+DEFAULT_TIMEOUTS: dict[str,float] = {
+	"document": 10,
+	"search_results": 6,
+	"job_details": 3,
+	"skills_button": 3,
+	"skills_modal": 3,
+	"sign_in_landing": 5
+}
+
+
+class PageReadiness():
+	"""
+	Waits until a named page is ready instead of sleeping for a fixed time.
+	The time each wait actually took is recorded in 'stats'.
+	"""
+	def __init__(
+			self,
+			get_driver:Callable[[],WebDriver],
+			logger:Logger,
+			timeouts:dict[str,float]|None=None,
+			poll_frequency:float=0.2
+			) -> None:
+		# The driver is fetched on each wait since the scrapper may re-initialize it
+		self.get_driver = get_driver
+		self.logger = logger
+		self.timeouts = dict(DEFAULT_TIMEOUTS,**(timeouts or {}))
+		self.poll_frequency = poll_frequency
+		self.stats: dict[str,dict] = {}
+
+	def wait(self, page:PageName) -> bool:
+		"""
+		Returns False if the page wasn't ready within its timeout
+		"""
+		timeout = self.timeouts[page]
+		start = monotonic()
+		try:
+			WebDriverWait(self.get_driver(),timeout,poll_frequency=self.poll_frequency).until(READY_CONDITIONS[page])
+			ready = True
+		except TimeoutException:
+			self.logger.debug(f"Page '{page}' was not ready after {timeout} seconds")
+			ready = False
+		self.record(page,monotonic()-start,ready)
+		return ready
+
+	def record(self, page:str, elapsed:float, ready:bool):
+		stat = self.stats.setdefault(page,{"count":0,"timeouts":0,"total":0.0,"max":0.0})
+		stat["count"] += 1
+		stat["timeouts"] += 0 if ready else 1
+		stat["total"] += elapsed
+		stat["max"] = max(stat["max"],elapsed)
+		self.logger.log(msg=f"Waited {elapsed:.2f}s for '{page}'",level=8)
+		metrics.get_metrics().timing(f"wait.{page}",elapsed*1000)
+		if not ready:
+			metrics.incr(f"wait.{page}.timeouts")
+
+	def summary(self) -> str:
+		return ", ".join(
+			f"{page}: avg={stat['total']/stat['count']:.2f}s max={stat['max']:.2f}s timeouts={stat['timeouts']}/{stat['count']}"
+			for page, stat in self.stats.items()
+		)
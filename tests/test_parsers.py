@@ -0,0 +1,68 @@
+from pathlib import Path
+import pytest
+
+pytest.importorskip("lxml")
+from src import parsers
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load(name:str):
+    return parsers.parse_html((FIXTURES / name).read_text(encoding="utf-8"))
+
+
+def test_job_top_card():
+    top_card = parsers.parse_job_top_card(load("job_page.html"))
+    assert top_card == {
+        "title": "Senior Python Developer",
+        "company_name": "Northwind Analytics",
+        "location": "Toronto, ON (Hybrid)",
+        "post_time_raw": "Reposted 2 weeks ago",
+        "n_applicants_raw": "Over 1,200 applicants",
+        "is_expired": False
+    }
+    assert parsers.parse_count(top_card["n_applicants_raw"]) == 1200
+
+def test_job_top_card_without_applicants():
+    top_card = parsers.parse_job_top_card(load("job_page_expired.html"))
+    assert top_card["company_name"] == "Contoso Freight"
+    assert top_card["location"] == "Montreal, QC"
+    assert top_card["post_time_raw"] == "3 months ago"
+    assert top_card["n_applicants_raw"] == "0 applicants"
+    assert top_card["is_expired"]
+
+def test_buttons():
+    page = load("job_page.html")
+    assert parsers.has_apply_button(page)
+    assert parsers.has_skills_button(page)
+    # An "Easy Apply" job is applied on LinkedIn
+    expired = load("job_page_expired.html")
+    assert not parsers.has_apply_button(expired)
+    assert not parsers.has_skills_button(expired)
+
+def test_skills_keep_the_first_text_of_each_item():
+    assert parsers.parse_skills(load("skills_modal.html")) == [
+        "Python (Programming Language)",
+        "Amazon Web Services (AWS)",
+        "SQL"
+    ]
+
+def test_no_skills_without_the_modal():
+    assert parsers.parse_skills(load("job_page.html")) == []
+
+def test_public_job_top_card():
+    page = load("job_page_public.html")
+    assert parsers.parse_job_top_card(page) == {
+        "title": "Backend Engineer",
+        "company_name": "Northwind Analytics",
+        "location": "Vancouver, British Columbia, Canada",
+        "post_time_raw": "5 days ago",
+        "n_applicants_raw": "Be among the first 25 applicants",
+        "is_expired": False
+    }
+    assert parsers.has_apply_button(page)
+    assert not parsers.has_skills_button(page)
+
+def test_public_page_detection():
+    assert parsers.is_public_page(load("job_page_public.html"))
+    assert not parsers.is_public_page(load("job_page.html"))